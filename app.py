@@ -1,8 +1,13 @@
 import streamlit as st
-import asyncio
-from research import deep_research
+import json
+import time
+from research import http_client
+from research import jobs
 from PIL import Image
 
+# Seconds between progress refreshes while a research job is running
+JOB_POLL_INTERVAL = 1.0
+
 # Page configuration
 st.set_page_config(
     page_title="Open DeepResearch",
@@ -94,11 +99,118 @@ with st.sidebar:
         - [Jina API Key](https://jina.ai/api-key)
     """)
 
-def run_research(user_query, iteration_limit, search_limit):
-    deep_research.OPENROUTER_API_KEY = st.session_state.openrouter_key
-    deep_research.SERPAPI_API_KEY = st.session_state.serpapi_key
-    deep_research.JINA_API_KEY = st.session_state.jina_key
-    return asyncio.run(deep_research.research_flow(user_query, iteration_limit, search_limit))
+@st.cache_resource
+def get_job_manager():
+    """
+    One background job manager per server process, shared by every session and kept across reruns.
+    """
+    return jobs.JobManager()
+
+def render_job_progress(job):
+    """
+    Show the progress of a queued or running job, including the report text streamed so far.
+    """
+    progress = job.progress
+    if job.status == "queued":
+        st.info("⏳ Waiting for a free research worker...")
+    elif progress.get("stage") == "report":
+        st.info(f"✍️ Writing the report from {progress.get('contexts', 0)} sources...")
+    else:
+        st.info(
+            f"🔄 Iteration {progress.get('iteration', 0)} of {job.iteration_limit}: "
+            f"{progress.get('links_processed', 0)} links processed, {progress.get('contexts', 0)} relevant sources found"
+        )
+    partial_report = job.report
+    if partial_report:
+        st.markdown(partial_report)
+    if st.button("⏹️ Cancel Research"):
+        get_job_manager().cancel(job.id)
+        st.rerun()
+
+def render_job_report(job):
+    """
+    Show a finished job's report, downloads and run statistics.
+    """
+    final_report = job.report
+    st.markdown("""
+        <div class='report-container'>
+            <h3 style='color: #1E88E5; margin-bottom: 1rem;'>📊 Research Report</h3>
+        </div>
+    """, unsafe_allow_html=True)
+    
+    tab1, tab2 = st.tabs(["📝 Formatted Report", "📄 Raw Text"])
+    
+    with tab1:
+        st.markdown(final_report)
+        if "report_time_to_first_token" in job.metrics:
+            st.caption(f"Report time to first token: {job.metrics['report_time_to_first_token']:.1f}s")
+    
+    with tab2:
+        st.text_area(
+            label="",
+            value=final_report,
+            height=500,
+            help="You can copy the raw text from here"
+        )
+    
+    st.download_button(
+        label="📥 Download Report",
+        data=final_report,
+        file_name="research_report.txt",
+        mime="text/plain"
+    )
+    
+    render_run_summary(job.tracer)
+
+def render_run_summary(tracer):
+    """
+    Show where the run's time and tokens went, per pipeline stage.
+    """
+    summary = tracer.summary()
+    if not summary:
+        return
+    with st.expander("⏱️ Run Statistics", expanded=False):
+        total_prompt = sum(stage["prompt_tokens"] for stage in summary.values())
+        total_completion = sum(stage["completion_tokens"] for stage in summary.values())
+        metric_a, metric_b, metric_c = st.columns(3)
+        metric_a.metric("LLM Calls", sum(stage["llm_calls"] for stage in summary.values()))
+        metric_b.metric("Prompt Tokens", f"{total_prompt:,}")
+        metric_c.metric("Completion Tokens", f"{total_completion:,}")
+        st.caption("Seconds are summed over concurrent spans, so stages can add up to more than the wall time.")
+        st.table([
+            {
+                "Stage": name,
+                "Spans": stage["count"],
+                "Seconds": round(stage["seconds"], 1),
+                "KB Fetched": round(stage["bytes"] / 1024, 1),
+                "Prompt Tokens": stage["prompt_tokens"],
+                "Completion Tokens": stage["completion_tokens"],
+                "Cache Hits": stage["cache_hits"],
+                "Retries": stage["retries"],
+                "Errors": stage["errors"],
+            }
+            for name, stage in summary.items()
+        ])
+        st.caption("Connection pools (shared by all runs in this server process)")
+        st.table([
+            {
+                "Pool": provider,
+                "Requests": pool["requests"],
+                "New Connections": pool["new_connections"],
+                "Reused": pool["reused_connections"],
+                "In Use": pool["in_use"],
+                "Idle": pool["idle"],
+                "Peak In Use": pool["peak_in_use"],
+            }
+            for provider, pool in http_client.pool_stats().items()
+            if pool["requests"]
+        ])
+        st.download_button(
+            label="📥 Download Trace (OpenTelemetry JSON)",
+            data=json.dumps(tracer.to_otel()),
+            file_name="research_trace.json",
+            mime="application/json"
+        )
 
 # Main content
 st.title("🔍 Open DeepResearch")
@@ -115,6 +227,10 @@ st.markdown("""
     </div>
 """, unsafe_allow_html=True)
 
+# One research job per session at a time; the form is disabled while it runs
+previous_job = get_job_manager().get(st.session_state.get('job_id'))
+job_running = previous_job is not None and not previous_job.done
+
 with st.container():
     col1, col2 = st.columns([2, 1])
     
@@ -130,7 +246,7 @@ with st.container():
                 disabled=not st.session_state.api_keys_configured
             )
             
-            col_a, col_b = st.columns(2)
+            col_a, col_b, col_c = st.columns(3)
             with col_a:
                 iter_limit_input = st.number_input(
                     "Maximum Iterations",
@@ -151,9 +267,20 @@ with st.container():
                     disabled=not st.session_state.api_keys_configured
                 )
             
+            with col_c:
+                time_limit_input = st.number_input(
+                    "Time Limit (minutes)",
+                    min_value=2,
+                    max_value=120,
+                    value=15,
+                    help="The report is written with whatever has been found when the time limit nears",
+                    disabled=not st.session_state.api_keys_configured
+                )
+            
             submitted = st.form_submit_button(
                 "🚀 Start Research",
-                disabled=not st.session_state.api_keys_configured
+                disabled=not st.session_state.api_keys_configured or job_running,
+                help="Cancel or wait for the running research before starting another" if job_running else None
             )
     
     with col2:
@@ -173,46 +300,42 @@ if submitted and st.session_state.api_keys_configured:
     if not user_query.strip():
         st.error("⚠️ Please enter a research query before proceeding.")
     else:
-        try:
-            with st.spinner("🔄 Conducting research... This may take a few minutes..."):
-                final_report = run_research(user_query, int(iter_limit_input), int(search_limit_input))
-            
-            st.markdown("""
-                <div class='report-container'>
-                    <h3 style='color: #1E88E5; margin-bottom: 1rem;'>📊 Research Report</h3>
-                </div>
-            """, unsafe_allow_html=True)
-            
-            tab1, tab2 = st.tabs(["📝 Formatted Report", "📄 Raw Text"])
-            
-            with tab1:
-                st.markdown(final_report)
-            
-            with tab2:
-                st.text_area(
-                    label="",
-                    value=final_report,
-                    height=500,
-                    help="You can copy the raw text from here"
-                )
-            
-            st.download_button(
-                label="📥 Download Report",
-                data=final_report,
-                file_name="research_report.txt",
-                mime="text/plain"
-            )
-            
-        except Exception as e:
-            st.error(f"❌ An error occurred during research: {str(e)}")
-            st.markdown("""
-                <div style='background-color: #ffebee; padding: 1rem; border-radius: 10px;'>
-                    <p style='color: #c62828;'>Please try again with a different query or contact support if the issue persists.</p>
-                </div>
-            """, unsafe_allow_html=True)
+        # Never leave an earlier job running unattended on this session's API keys
+        if previous_job is not None and not previous_job.done:
+            get_job_manager().cancel(previous_job.id)
+        job = get_job_manager().submit(
+            user_query, int(iter_limit_input), int(search_limit_input), int(time_limit_input) * 60,
+            api_keys={
+                "openrouter": st.session_state.openrouter_key,
+                "serpapi": st.session_state.serpapi_key,
+                "jina": st.session_state.jina_key,
+            }
+        )
+        st.session_state.job_id = job.id
+
+# The job runs in the background, so it survives reruns; this page only polls its progress
+current_job = get_job_manager().get(st.session_state.get('job_id'))
+if current_job is not None:
+    if not current_job.done:
+        render_job_progress(current_job)
+    elif current_job.status == "done":
+        render_job_report(current_job)
+    elif current_job.status == "cancelled":
+        st.warning("⏹️ The research was cancelled.")
+    else:
+        st.error(f"❌ An error occurred during research: {current_job.error}")
+        st.markdown("""
+            <div style='background-color: #ffebee; padding: 1rem; border-radius: 10px;'>
+                <p style='color: #c62828;'>Please try again with a different query or contact support if the issue persists.</p>
+            </div>
+        """, unsafe_allow_html=True)
 
 st.markdown("""
     <div style='text-align: center; color: #666; padding: 2rem;'>
         <p>Built by GitsSaikat ❤️</p>
     </div>
 """, unsafe_allow_html=True)
+
+if current_job is not None and not current_job.done:
+    time.sleep(JOB_POLL_INTERVAL)
+    st.rerun()
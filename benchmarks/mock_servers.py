@@ -0,0 +1,260 @@
+# Local aiohttp stand-ins for OpenRouter, SerpAPI and Jina, used by the offline benchmark harness.
+# Each server has a configurable latency distribution, error and 429 rates; the Jina stand-in serves
+# generated markdown pages of a configurable size. A fixture website serves the same pages as HTML
+# (with navigation, scripts and footers) for the local fetch backend.
+import asyncio
+import hashlib
+import json
+import random
+import re
+import socket
+
+from aiohttp import web
+
+TOPIC_WORDS = ["solar", "battery", "storage", "grid", "energy", "capacity", "efficiency", "cost", "policy", "demand"]
+FILLER_WORDS = [
+    "analysis", "report", "data", "market", "growth", "system", "annual", "regional", "study", "model",
+    "technology", "investment", "network", "supply", "average", "sector", "project", "scale", "impact", "trend",
+]
+
+class ServerProfile:
+    """
+    Behaviour of one mock provider.
+    latency_median / latency_sigma: lognormal latency in seconds
+    error_rate: fraction of requests answered with HTTP 500
+    throttle_rate: fraction answered with HTTP 429 and a Retry-After header
+    """
+    def __init__(self, latency_median=0.05, latency_sigma=0.5, error_rate=0.0, throttle_rate=0.0, retry_after=1):
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.retry_after = retry_after
+
+    def latency(self, rng):
+        if self.latency_median <= 0:
+            return 0.0
+        return rng.lognormvariate(0, self.latency_sigma) * self.latency_median
+
+class MockProviders:
+    """
+    Runs the mock servers on ephemeral localhost ports and counts the calls each one receives.
+    site_links: when true, search results point at the fixture website instead of bench.example
+    site_failure_rate: fraction of fixture pages served as a script-only shell or a PDF, which a local
+    extraction cannot read
+    """
+    def __init__(self, openrouter=None, serpapi=None, jina=None, site=None, page_chars=20000, link_pool=200,
+                 relevant_rate=0.7, seed=0, site_links=False, site_failure_rate=0.0):
+        self.profiles = {
+            "openrouter": openrouter or ServerProfile(latency_median=0.2),
+            "serpapi": serpapi or ServerProfile(latency_median=0.3),
+            "jina": jina or ServerProfile(latency_median=0.5),
+            "site": site or ServerProfile(latency_median=0.2),
+        }
+        self.page_chars = page_chars
+        self.link_pool = link_pool
+        self.relevant_rate = relevant_rate
+        self.site_links = site_links
+        self.site_failure_rate = site_failure_rate
+        self.rng = random.Random(seed)
+        self.counts = {name: {"requests": 0, "errors": 0, "throttled": 0} for name in self.profiles}
+        self.purposes = {}
+        self._query_counter = 0
+        self._runners = []
+        self.urls = {}
+
+    async def start(self):
+        apps = {
+            "openrouter": self._app([web.post("/api/v1/chat/completions", self.handle_openrouter)]),
+            "serpapi": self._app([web.get("/search", self.handle_serpapi)]),
+            "jina": self._app([web.get("/{target:.*}", self.handle_jina)]),
+            "site": self._app([web.get("/article/{page_id}", self.handle_site)]),
+        }
+        for name, app in apps.items():
+            runner = web.AppRunner(app, access_log=None)
+            await runner.setup()
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.bind(("127.0.0.1", 0))
+            site = web.SockSite(runner, sock)
+            await site.start()
+            self._runners.append(runner)
+            port = sock.getsockname()[1]
+            self.urls[name] = f"http://127.0.0.1:{port}"
+        # The fixture website's URL is in self.urls["site"]
+        return {
+            "OPENROUTER_URL": self.urls["openrouter"] + "/api/v1/chat/completions",
+            "SERPAPI_URL": self.urls["serpapi"] + "/search",
+            "JINA_BASE_URL": self.urls["jina"] + "/",
+        }
+
+    async def stop(self):
+        for runner in self._runners:
+            await runner.cleanup()
+        self._runners = []
+
+    def _app(self, routes):
+        app = web.Application()
+        app.add_routes(routes)
+        return app
+
+    async def _gate(self, name):
+        """
+        Apply latency and injected failures. Returns an error response, or None to proceed.
+        """
+        profile = self.profiles[name]
+        counts = self.counts[name]
+        counts["requests"] += 1
+        await asyncio.sleep(profile.latency(self.rng))
+        roll = self.rng.random()
+        if roll < profile.throttle_rate:
+            counts["throttled"] += 1
+            return web.Response(status=429, text="rate limited", headers={"Retry-After": str(profile.retry_after)})
+        if roll < profile.throttle_rate + profile.error_rate:
+            counts["errors"] += 1
+            return web.Response(status=500, text="injected error")
+        return None
+
+    # --- OpenRouter -------------------------------------------------------
+
+    def _words(self, count):
+        vocabulary = TOPIC_WORDS + FILLER_WORDS
+        return " ".join(self.rng.choice(vocabulary) for _ in range(count))
+
+    def _new_queries(self, count):
+        queries = []
+        for _ in range(count):
+            self._query_counter += 1
+            queries.append(f"{self.rng.choice(TOPIC_WORDS)} {self.rng.choice(FILLER_WORDS)} {self._query_counter}")
+        return queries
+
+    def _reply_for(self, content):
+        """
+        Pick a plausible reply from the prompt wording of each call site.
+        """
+        if "JSON object mapping each page ID" in content:
+            purpose = "relevance_batch"
+            ids = re.findall(r"=== Page (\w+) ===", content)
+            reply = json.dumps({page_id: "Yes" if self.rng.random() < self.relevant_rate else "No" for page_id in ids})
+        elif "Reply strictly with one word" in content:
+            purpose = "relevance"
+            reply = "Yes" if self.rng.random() < self.relevant_rate else "No"
+        elif "systematic research planner" in content:
+            purpose = "planning"
+            reply = str(self._new_queries(self.rng.randint(2, 4)))
+        elif "Python list of strings" in content:
+            purpose = "queries"
+            reply = str(self._new_queries(4))
+        elif "academic report writer" in content:
+            purpose = "report"
+            reply = "\n\n".join(f"{self._words(60)} [{index + 1}]" for index in range(12))
+        elif "expert extractor" in content:
+            purpose = "extraction"
+            reply = self._words(150)
+        else:
+            purpose = "other"
+            reply = self._words(200)
+        self.purposes[purpose] = self.purposes.get(purpose, 0) + 1
+        return reply
+
+    async def handle_openrouter(self, request):
+        failure = await self._gate("openrouter")
+        if failure is not None:
+            return failure
+        payload = await request.json()
+        content = "\n".join(message.get("content", "") for message in payload.get("messages", []))
+        reply = self._reply_for(content)
+        usage = {"prompt_tokens": len(content) // 4, "completion_tokens": len(reply) // 4}
+        if not payload.get("stream"):
+            return web.json_response({"choices": [{"message": {"content": reply}}], "usage": usage})
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        await response.write(b": OPENROUTER PROCESSING\n\n")
+        words = reply.split(" ")
+        for start in range(0, len(words), 8):
+            delta = " ".join(words[start:start + 8]) + " "
+            chunk = {"choices": [{"delta": {"content": delta}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            await asyncio.sleep(0.002)
+        await response.write(f"data: {json.dumps({'choices': [], 'usage': usage})}\n\n".encode("utf-8"))
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+    # --- SerpAPI ----------------------------------------------------------
+
+    async def handle_serpapi(self, request):
+        failure = await self._gate("serpapi")
+        if failure is not None:
+            return failure
+        num = int(request.query.get("num", 10))
+        page_ids = self.rng.sample(range(self.link_pool), min(num, self.link_pool))
+        base = self.urls["site"] if self.site_links else "https://bench.example"
+        results = [{"link": f"{base}/article/{page_id}", "title": f"Article {page_id}"} for page_id in page_ids]
+        return web.json_response({"organic_results": results})
+
+    # --- Jina -------------------------------------------------------------
+
+    def _page(self, target):
+        """
+        Deterministic markdown page for a URL, about page_chars long. Text beyond the first 50000
+        characters repeats, so very large pages stay cheap to generate.
+        """
+        seed = int(hashlib.sha256(target.encode("utf-8")).hexdigest()[:8], 16)
+        rng = random.Random(seed)
+        vocabulary = TOPIC_WORDS + FILLER_WORDS
+        parts = [f"Title: {target}\n\n"]
+        size = len(parts[0])
+        section = 0
+        while size < min(self.page_chars, 50000):
+            section += 1
+            heading = f"## Section {section}: {rng.choice(TOPIC_WORDS)} {rng.choice(FILLER_WORDS)}\n\n"
+            paragraph = " ".join(rng.choice(vocabulary) for _ in range(rng.randint(60, 160))) + ".\n\n"
+            parts.append(heading + paragraph)
+            size += len(heading) + len(paragraph)
+        page = "".join(parts)
+        return (page * (self.page_chars // len(page) + 1))[:self.page_chars]
+
+    async def handle_jina(self, request):
+        failure = await self._gate("jina")
+        if failure is not None:
+            return failure
+        return web.Response(text=self._page(request.match_info["target"]), content_type="text/plain")
+
+    # --- Fixture website --------------------------------------------------
+
+    def _html_page(self, target):
+        """
+        The markdown page for target rendered as HTML inside typical page chrome.
+        """
+        body = []
+        for block in self._page(target).split("\n\n"):
+            if block.startswith("## "):
+                body.append(f"<h2>{block[3:]}</h2>")
+            elif block.startswith("Title: "):
+                body.append(f"<h1>{block[7:]}</h1>")
+            elif block.strip():
+                body.append(f"<p>{block}</p>")
+        return (
+            f"<!DOCTYPE html><html><head><title>{target}</title>"
+            "<script>window.analytics = {track: function () {}};</script><style>body { margin: 0 }</style></head>"
+            "<body><header><a href='/'>Home</a> <a href='/about'>About</a></header>"
+            "<nav><ul><li><a href='/energy'>Energy</a></li><li><a href='/policy'>Policy</a></li></ul></nav>"
+            "<div class='cookie-banner'>This site uses cookies.</div>"
+            f"<main><article>{''.join(body)}</article></main>"
+            "<aside class='related'><a href='/article/1'>Related article</a></aside>"
+            "<footer>Copyright Bench Example</footer></body></html>"
+        )
+
+    async def handle_site(self, request):
+        failure = await self._gate("site")
+        if failure is not None:
+            return failure
+        target = request.path
+        roll = random.Random(target).random()
+        if roll < self.site_failure_rate / 2:
+            return web.Response(body=b"%PDF-1.4 binary", content_type="application/pdf")
+        if roll < self.site_failure_rate:
+            return web.Response(text="<html><body><div id='root'></div><script src='app.js'></script></body></html>",
+                                content_type="text/html")
+        return web.Response(text=self._html_page(target), content_type="text/html")
@@ -0,0 +1,222 @@
+import argparse
+import asyncio
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.mock_servers import MockProviders, ServerProfile
+from research import cache
+from research import deadlines
+from research import deep_research
+from research import fetchers
+from research import http_client
+from research import prefilter
+from research import routing
+from research import scheduler
+from research import tracing
+
+# Scripted scenarios; each entry overrides the defaults below
+DEFAULT_SCENARIO = {
+    "iteration_limit": 3,
+    "search_limit": 5,
+    "page_chars": 20000,
+    "link_pool": 200,
+    "relevant_rate": 0.7,
+    "openrouter": {"latency_median": 0.2, "latency_sigma": 0.5},
+    "serpapi": {"latency_median": 0.3, "latency_sigma": 0.4},
+    "jina": {"latency_median": 0.5, "latency_sigma": 0.8},
+    "site": {"latency_median": 0.2, "latency_sigma": 0.5},
+    "local_fetch": False,        # fetch pages from the fixture website with the local HTML backend
+    "site_failure_rate": 0.0,
+    "stream": False,
+    "deadline_seconds": None,
+}
+
+SCENARIOS = {
+    "baseline": {},
+    "wide": {"search_limit": 20},
+    "deep": {"iteration_limit": 8},
+    "large-pages": {"page_chars": 200000},
+    "huge-pages": {"page_chars": 5000000},
+    "small-pages": {"page_chars": 3000},
+    "flaky": {
+        "openrouter": {"latency_median": 0.2, "error_rate": 0.05, "throttle_rate": 0.1},
+        "jina": {"latency_median": 0.5, "latency_sigma": 1.2, "error_rate": 0.05},
+    },
+    "slow-tail": {"jina": {"latency_median": 0.3, "latency_sigma": 1.5}},
+    "deadline": {"iteration_limit": 10, "search_limit": 10, "deadline_seconds": 20},
+    "streamed-report": {"stream": True},
+    "local-fetch": {"local_fetch": True},
+    "local-fetch-fallback": {"local_fetch": True, "site_failure_rate": 0.3},
+}
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def current_rss_mb():
+    """
+    Resident set size of this process, from /proc on Linux; falls back to the process peak elsewhere.
+    """
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+async def sample_peak_rss(peak, interval=0.05):
+    """
+    Record the highest RSS seen while the scenario runs; ru_maxrss alone only reports the process-wide high-water mark.
+    """
+    while True:
+        peak[0] = max(peak[0], current_rss_mb())
+        await asyncio.sleep(interval)
+
+def stage_latencies(tracer):
+    """
+    p50/p95 span duration and span count per stage.
+    """
+    durations = {}
+    for span in tracer.spans:
+        durations.setdefault(span.name, []).append(span.duration)
+    return {
+        name: {"count": len(values), "p50": percentile(values, 0.5), "p95": percentile(values, 0.95)}
+        for name, values in durations.items()
+    }
+
+async def run_scenario(name, overrides, seed, trace_heap=False):
+    """
+    Run one scenario against fresh mock providers. trace_heap: measure the peak Python heap with tracemalloc
+    (which slows the run, so its timings should not be reported)
+    """
+    config = dict(DEFAULT_SCENARIO, **overrides)
+    providers = MockProviders(
+        openrouter=ServerProfile(**config["openrouter"]),
+        serpapi=ServerProfile(**config["serpapi"]),
+        jina=ServerProfile(**config["jina"]),
+        site=ServerProfile(**config["site"]),
+        page_chars=config["page_chars"],
+        link_pool=config["link_pool"],
+        relevant_rate=config["relevant_rate"],
+        seed=seed,
+        site_links=config["local_fetch"],
+        site_failure_rate=config["site_failure_rate"],
+    )
+    endpoints = await providers.start()
+    fetchers.DOMAIN_BACKENDS = {"127.0.0.1": "local"} if config["local_fetch"] else {}
+    for attribute, url in endpoints.items():
+        setattr(deep_research, attribute, url)
+    deep_research.OPENROUTER_API_KEY = deep_research.SERPAPI_API_KEY = deep_research.JINA_API_KEY = "benchmark"
+    # Every scenario starts from fresh process-wide trackers, so its numbers (hedge delays and budget,
+    # audit samples, pool counters) do not depend on which scenarios ran before it
+    scheduler.reset_limiters()
+    http_client.reset_pool_stats()
+    fetchers.STATS = fetchers.FetchStats()
+    prefilter.STATS = prefilter.PrefilterStats(seed)
+    routing.STATS = routing.ModelStats()
+    deep_research.FETCH_LATENCY = deadlines.LatencyTracker()
+
+    tracer = tracing.Tracer(run_name=name)
+    if trace_heap:
+        tracemalloc.start()
+    metrics = {}
+    rss_before = current_rss_mb()
+    peak_rss = [rss_before]
+    sampler = asyncio.create_task(sample_peak_rss(peak_rss))
+    started = time.monotonic()
+    try:
+        if config["stream"]:
+            report = "".join([chunk async for chunk in deep_research.research_flow_stream(
+                "solar battery storage for the grid", config["iteration_limit"], config["search_limit"],
+                metrics, config["deadline_seconds"], tracer, keep_pool=True
+            )])
+        else:
+            report = await deep_research.research_flow(
+                "solar battery storage for the grid", config["iteration_limit"], config["search_limit"],
+                config["deadline_seconds"], tracer, keep_pool=True
+            )
+    finally:
+        wall_time = time.monotonic() - started
+        sampler.cancel()
+        peak_heap = None
+        if trace_heap:
+            _, peak_heap = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        pools = http_client.pool_stats()
+        await http_client.close_client()
+        await providers.stop()
+
+    return {
+        "scenario": name,
+        "config": config,
+        "wall_time": wall_time,
+        "report_chars": len(report),
+        "report_time_to_first_token": metrics.get("report_time_to_first_token"),
+        "peak_python_heap_mb": peak_heap / 1024 / 1024 if peak_heap is not None else None,
+        "peak_rss_mb": peak_rss[0],
+        "rss_growth_mb": peak_rss[0] - rss_before,
+        # ru_maxrss is kilobytes on Linux and the high-water mark of the whole process
+        "process_max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "stages": stage_latencies(tracer),
+        "stage_totals": tracer.summary(),
+        "provider_calls": providers.counts,
+        "connection_pools": pools,
+        "fetch_backends": fetchers.STATS.stats(),
+        "llm_calls_by_purpose": providers.purposes,
+    }
+
+def print_result(result):
+    print(f"\n=== {result['scenario']} ===")
+    print(f"wall time: {result['wall_time']:.2f}s   report: {result['report_chars']} chars   "
+          f"peak RSS: {result['peak_rss_mb']:.1f} MB (+{result['rss_growth_mb']:.1f} MB during the run)")
+    if result["peak_python_heap_mb"] is not None:
+        print(f"peak Python heap (separate tracemalloc pass): {result['peak_python_heap_mb']:.1f} MB")
+    if result["report_time_to_first_token"] is not None:
+        print(f"report time to first token: {result['report_time_to_first_token']:.2f}s")
+    print(f"{'stage':<12}{'count':>7}{'p50 (s)':>10}{'p95 (s)':>10}")
+    for stage, values in result["stages"].items():
+        print(f"{stage:<12}{values['count']:>7}{values['p50']:>10.3f}{values['p95']:>10.3f}")
+    for provider, counts in result["provider_calls"].items():
+        print(f"{provider}: {counts['requests']} requests, {counts['errors']} errors, {counts['throttled']} throttled")
+    print("LLM calls by purpose:", result["llm_calls_by_purpose"])
+    print("Fetch backends:", result["fetch_backends"])
+
+def main():
+    """
+    Run benchmark scenarios against local mock providers; no API keys or network access needed.
+    """
+    parser = argparse.ArgumentParser(description="Offline benchmark for research_flow")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="Scenario to run (repeatable). Defaults to all scenarios.")
+    parser.add_argument("--output", help="Append results as JSON lines to this file")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-heap", action="store_true",
+                        help="Also measure the peak Python heap in a second, untimed pass of each scenario "
+                             "(tracemalloc slows every allocation, so the timed pass runs without it)")
+    args = parser.parse_args()
+
+    # Benchmarks measure the pipeline itself, so caches start empty and are thrown away afterwards
+    cache.CACHE_DIR = tempfile.mkdtemp(prefix="deep-research-bench-")
+    cache.PAGE_CACHE_ENABLED = False
+    cache.LLM_CACHE_ENABLED = False
+
+    for name in args.scenario or list(SCENARIOS):
+        result = asyncio.run(run_scenario(name, SCENARIOS[name], args.seed))
+        if args.trace_heap:
+            heap_pass = asyncio.run(run_scenario(name, SCENARIOS[name], args.seed, trace_heap=True))
+            result["peak_python_heap_mb"] = heap_pass["peak_python_heap_mb"]
+        print_result(result)
+        if args.output:
+            with open(args.output, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result) + "\n")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import time
+
+from research import deep_research
+from research import http_client
+from research import routing
+from research import scheduler
+from research import tracing
+
+# Batch defaults; each topic line may override iteration_limit, search_limit and deadline_seconds
+BATCH_MAX_CONCURRENT_RUNS = 4
+BATCH_TOKEN_BUDGET = None        # total prompt + completion tokens for the whole batch; None means unlimited
+BATCH_ITERATION_LIMIT = 5
+BATCH_SEARCH_LIMIT = 5
+# Environment variables the CLI reads the provider API keys from (overridable with --openrouter-key etc.)
+API_KEY_ENV_VARS = {"openrouter": "OPENROUTER_API_KEY", "serpapi": "SERPAPI_API_KEY", "jina": "JINA_API_KEY"}
+
+def read_topics(path):
+    """
+    Read topics from a JSONL file. Each line is either a JSON string or an object with a "topic"
+    (or "query") field and optional "id", "iteration_limit", "search_limit" and "deadline_seconds".
+    """
+    records = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if isinstance(record, str):
+                record = {"topic": record}
+            topic = record.get("topic") or record.get("query")
+            if not topic:
+                print(f"Skipping line {line_number} of {path}: no 'topic' field")
+                continue
+            record["topic"] = topic
+            record.setdefault("id", str(line_number))
+            records.append(record)
+    return records
+
+def tracer_tokens(tracer):
+    return sum(stage["prompt_tokens"] + stage["completion_tokens"] for stage in tracer.summary().values())
+
+class BatchRunner:
+    """
+    Runs many research_flow instances concurrently. The runs share the process-wide pooled HTTP client,
+    page/LLM caches and provider limiters, whose concurrency slots are split fairly between runs so
+    a topic with many links cannot starve the others.
+    max_concurrent_runs: Number of runs in progress at once; further topics wait in input order
+    token_budget: Soft token budget for the batch: once spent, no new runs start, but runs in progress finish,
+    so the batch can overshoot it by up to max_concurrent_runs runs
+    api_keys: Optional dict with "openrouter", "serpapi" and "jina" keys used by every run
+    """
+    def __init__(self, max_concurrent_runs=BATCH_MAX_CONCURRENT_RUNS, token_budget=BATCH_TOKEN_BUDGET,
+                 iteration_limit=BATCH_ITERATION_LIMIT, search_limit=BATCH_SEARCH_LIMIT, deadline_seconds=None,
+                 api_keys=None):
+        self.max_concurrent_runs = max_concurrent_runs
+        self.token_budget = token_budget
+        self.iteration_limit = iteration_limit
+        self.search_limit = search_limit
+        self.deadline_seconds = deadline_seconds
+        self.api_keys = api_keys
+        self.tracers = []
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def tokens_used(self):
+        return sum(tracer_tokens(tracer) for tracer in self.tracers)
+
+    def budget_exhausted(self):
+        return self.token_budget is not None and self.tokens_used() >= self.token_budget
+
+    async def run_topic(self, semaphore, record):
+        """
+        Research one topic once a run slot is free. Returns the JSON-serializable result record.
+        """
+        result = {"id": record["id"], "topic": record["topic"]}
+        async with semaphore:
+            if self.budget_exhausted():
+                self.skipped += 1
+                return dict(result, status="skipped", error="Batch token budget exhausted")
+
+            tracer = tracing.Tracer(run_name="batch")
+            self.tracers.append(tracer)
+            started = time.monotonic()
+            try:
+                with deep_research.use_api_keys(self.api_keys) if self.api_keys else contextlib.nullcontext():
+                    report = await deep_research.research_flow(
+                        record["topic"],
+                        record.get("iteration_limit", self.iteration_limit),
+                        record.get("search_limit", self.search_limit),
+                        record.get("deadline_seconds", self.deadline_seconds),
+                        tracer,
+                        keep_pool=True
+                    )
+                status = "no_queries" if report == deep_research.NO_QUERIES_MESSAGE else "ok"
+                error = None
+            except Exception as e:
+                print(f"Batch run {record['id']} failed:", e)
+                report, status, error = None, "error", str(e)
+
+        if status == "error":
+            self.failed += 1
+        else:
+            self.completed += 1
+        return dict(
+            result,
+            status=status,
+            error=error,
+            report=report,
+            seconds=time.monotonic() - started,
+            tokens=tracer_tokens(tracer),
+            stages=tracer.summary(),
+        )
+
+    async def run(self, records, output_path):
+        """
+        Research every record and append one JSON line per topic to output_path as each run finishes.
+        Returns overall batch stats.
+        """
+        started = time.monotonic()
+        semaphore = asyncio.Semaphore(self.max_concurrent_runs)
+        tasks = [asyncio.create_task(self.run_topic(semaphore, record)) for record in records]
+        with open(output_path, "a", encoding="utf-8") as out:
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                print(f"[{self.completed + self.failed + self.skipped}/{len(records)}] "
+                      f"{result['id']}: {result['status']} ({self.tokens_used()} tokens used by the batch)")
+        stats = {
+            "topics": len(records),
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "tokens": self.tokens_used(),
+            "seconds": time.monotonic() - started,
+            "providers": scheduler.limiter_stats(),
+            "connection_pools": http_client.pool_stats(),
+            "models": routing.STATS.stats(),
+        }
+        await http_client.close_client()
+        return stats
+
+def main():
+    """
+    CLI entry point: python -m research.batch topics.jsonl results.jsonl
+    API keys come from OPENROUTER_API_KEY, SERPAPI_API_KEY and JINA_API_KEY unless given as options.
+    """
+    parser = argparse.ArgumentParser(description="Run research_flow for every topic in a JSONL file")
+    parser.add_argument("topics", help="Input JSONL file, one topic per line")
+    parser.add_argument("output", help="Output JSONL file; one result line is appended per topic")
+    parser.add_argument("--concurrency", type=int, default=BATCH_MAX_CONCURRENT_RUNS, help="Runs in progress at once")
+    parser.add_argument("--token-budget", type=int, default=BATCH_TOKEN_BUDGET,
+                        help="Soft token budget for the batch: no new runs start once it is spent, but runs in "
+                             "progress finish, so it can be exceeded by up to --concurrency runs")
+    parser.add_argument("--iterations", type=int, default=BATCH_ITERATION_LIMIT)
+    parser.add_argument("--search-limit", type=int, default=BATCH_SEARCH_LIMIT)
+    parser.add_argument("--deadline", type=float, default=None, help="Per-run time limit in seconds")
+    for provider, env_var in API_KEY_ENV_VARS.items():
+        parser.add_argument(f"--{provider}-key", default=os.environ.get(env_var),
+                            help=f"{provider} API key (default: ${env_var})")
+    args = parser.parse_args()
+
+    api_keys = {provider: getattr(args, f"{provider}_key") for provider in API_KEY_ENV_VARS}
+    missing = [env_var for provider, env_var in API_KEY_ENV_VARS.items() if not api_keys[provider]]
+    if missing:
+        parser.error(f"missing API keys: set {', '.join(missing)} or pass the matching --<provider>-key options")
+
+    runner = BatchRunner(args.concurrency, args.token_budget, args.iterations, args.search_limit, args.deadline,
+                         api_keys)
+    stats = asyncio.run(runner.run(read_topics(args.topics), args.output))
+    print("Batch stats:", json.dumps(stats, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+# Location of the on-disk caches; shared by every run in the process and across restarts
+CACHE_DIR = os.environ.get(
+    "DEEP_RESEARCH_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "open-deep-research")
+)
+
+# Page cache settings
+PAGE_CACHE_ENABLED = True
+PAGE_CACHE_TTL = 7 * 24 * 60 * 60          # seconds a fetched page stays valid
+PAGE_CACHE_MAX_BYTES = 256 * 1024 * 1024   # compressed bytes kept on disk before LRU eviction
+
+# LLM response cache settings (opt-in)
+LLM_CACHE_ENABLED = False
+LLM_CACHE_TTL = 3 * 24 * 60 * 60
+LLM_CACHE_MAX_BYTES = 128 * 1024 * 1024
+LLM_CACHE_MEMORY_ENTRIES = 1024
+# Per-call-site policy: only purposes mapped to True are served from or written to the cache
+LLM_CACHE_POLICIES = {
+    "queries": True,
+    "relevance": True,
+    "extraction": True,
+    "planning": False,
+    "summary": False,
+    "synthesis": False,
+    "report": False,
+}
+
+class DiskCache:
+    """
+    SQLite-backed key/value store with per-entry TTL, size-bounded LRU eviction and zlib-compressed values.
+    Safe to share between threads; hit/miss counters are kept for the lifetime of the object.
+    """
+    def __init__(self, path, ttl, max_bytes):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()
+        self._total_bytes = row[0]
+
+    def get(self, key):
+        """
+        Return the cached string for key, or None when it is missing or older than the TTL.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, size, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, size, created = row
+            if self.ttl is not None and now - created > self.ttl:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+        return zlib.decompress(value).decode("utf-8")
+
+    def set(self, key, value):
+        """
+        Store a string under key, then evict least recently used entries until the cache fits max_bytes.
+        """
+        blob = zlib.compress(value.encode("utf-8"), 6)
+        size = len(blob)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                self._total_bytes -= row[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, size, now, now)
+            )
+            self._total_bytes += size
+            self._evict()
+
+    def _evict(self):
+        if self.max_bytes is None:
+            return
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM entries ORDER BY accessed ASC LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                return
+            for key, size in rows:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._total_bytes = 0
+
+    def stats(self):
+        """
+        Return hit/miss counters and current size, for checking the cache's effectiveness.
+        """
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": self._total_bytes,
+        }
+
+class MemoryCache:
+    """
+    Small in-process LRU with per-entry TTL, used as the fast tier in front of a DiskCache.
+    """
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                self.misses += 1
+                return None
+            value, created = item
+            if self.ttl is not None and now - created > self.ttl:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+class LLMResponseCache:
+    """
+    Two-tier (memory, then disk) cache for chat completions keyed on a hash of the request parameters.
+    Whether a call is cacheable is decided per call site through LLM_CACHE_POLICIES.
+    """
+    def __init__(self, path, ttl, max_bytes, memory_entries, policies=None):
+        self.memory = MemoryCache(memory_entries, ttl)
+        self.disk = DiskCache(path, ttl, max_bytes)
+        self.policies = policies if policies is not None else LLM_CACHE_POLICIES
+
+    @staticmethod
+    def make_key(model, messages, temperature, max_tokens):
+        payload = json.dumps([model, messages, temperature, max_tokens], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def allows(self, purpose):
+        return bool(purpose) and self.policies.get(purpose, False)
+
+    def get(self, key):
+        value = self.memory.get(key)
+        if value is not None:
+            return value
+        value = self.disk.get(key)
+        if value is not None:
+            self.memory.set(key, value)
+        return value
+
+    def set(self, key, value):
+        self.memory.set(key, value)
+        self.disk.set(key, value)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+    def stats(self):
+        return {"memory": self.memory.stats(), "disk": self.disk.stats()}
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+def get_page_cache():
+    """
+    Return the process-wide page cache, creating it on first use. Returns None when caching is disabled.
+    """
+    global _page_cache
+    if not PAGE_CACHE_ENABLED:
+        return None
+    with _page_cache_lock:
+        if _page_cache is None:
+            _page_cache = DiskCache(
+                os.path.join(CACHE_DIR, "pages.sqlite3"), PAGE_CACHE_TTL, PAGE_CACHE_MAX_BYTES
+            )
+    return _page_cache
+
+_llm_cache = None
+_llm_cache_lock = threading.Lock()
+
+def get_llm_cache():
+    """
+    Return the process-wide LLM response cache, creating it on first use. Returns None unless LLM_CACHE_ENABLED is set.
+    """
+    global _llm_cache
+    if not LLM_CACHE_ENABLED:
+        return None
+    with _llm_cache_lock:
+        if _llm_cache is None:
+            _llm_cache = LLMResponseCache(
+                os.path.join(CACHE_DIR, "llm_responses.sqlite3"),
+                LLM_CACHE_TTL, LLM_CACHE_MAX_BYTES, LLM_CACHE_MEMORY_ENTRIES
+            )
+    return _llm_cache
@@ -0,0 +1,126 @@
+import json
+import os
+import time
+
+# Records are buffered and written together; fsync happens only at round boundaries and on close
+CHECKPOINT_BATCH_SIZE = 20
+CHECKPOINT_FLUSH_SECONDS = 2.0
+
+class Checkpoint:
+    """
+    Append-only JSONL log of a research run, written as stages complete, from which an interrupted run
+    can be resumed. Record types:
+    run: the query and limits of the run (first line)
+    round: the queries of a round about to start, plus the research summary at that point
+    search: the links a search returned
+    link: a link that went through the whole pipeline, with its extracted context or null if it was dropped
+    done: the run finished and wrote its report; the log can no longer be resumed
+    Opening an existing file loads its state; a truncated last line (e.g. after a crash) is ignored.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.done = False
+        self.run = None
+        self.round = None
+        self.queries = []
+        self.searches = {}
+        self.links = {}
+        self.contexts = []
+        self._buffer = []
+        self._file = None
+        self._last_flush = time.monotonic()
+        if os.path.exists(path):
+            self._load()
+
+    @property
+    def resumed(self):
+        """
+        True when the log holds an unfinished run with at least one planned round.
+        """
+        return self.run is not None and self.round is not None and not self.done
+
+    def matches(self, user_query, iteration_limit, search_limit):
+        """
+        True when the logged run has the given query and limits (or no run is logged yet).
+        """
+        if self.run is None:
+            return True
+        return (self.run["user_query"], self.run["iteration_limit"], self.run["search_limit"]) == (
+            user_query, iteration_limit, search_limit
+        )
+
+    def reset(self):
+        """
+        Discard the log and its loaded state, e.g. to reuse the path of a finished run for a new one.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        open(self.path, "w", encoding="utf-8").close()
+        self.done = False
+        self.run = None
+        self.round = None
+        self.queries = []
+        self.searches = {}
+        self.links = {}
+        self.contexts = []
+        self._buffer = []
+
+    def _load(self):
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                kind = record.get("type")
+                if kind == "done":
+                    self.done = True
+                elif kind == "run":
+                    self.run = record
+                elif kind == "round":
+                    self.round = record
+                    self.queries.extend(query for query in record["queries"] if query not in self.queries)
+                elif kind == "search":
+                    self.searches[record["query"]] = record["links"]
+                elif kind == "link" and record["link"] not in self.links:
+                    self.links[record["link"]] = record.get("context")
+                    if record.get("context"):
+                        self.contexts.append((record["context"], record["link"]))
+
+    def record(self, kind, **data):
+        """
+        Buffer a record; the buffer is written once it is large or old enough.
+        """
+        self._buffer.append(json.dumps(dict(data, type=kind)))
+        if (len(self._buffer) >= CHECKPOINT_BATCH_SIZE
+                or time.monotonic() - self._last_flush >= CHECKPOINT_FLUSH_SECONDS):
+            self.flush()
+
+    def flush(self, sync=False):
+        """
+        Write buffered records; with sync=True also fsync so they survive a machine crash.
+        """
+        if self._buffer:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write("\n".join(self._buffer) + "\n")
+            self._buffer = []
+        if self._file is not None:
+            self._file.flush()
+            if sync:
+                os.fsync(self._file.fileno())
+        self._last_flush = time.monotonic()
+
+    def finish(self):
+        """
+        Record that the run completed, so the log is not resumed again, and close it.
+        """
+        self.record("done")
+        self.close()
+
+    def close(self):
+        self.flush(sync=True)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
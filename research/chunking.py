@@ -0,0 +1,138 @@
+import math
+import re
+from collections import Counter
+
+# Chunking settings
+CHUNK_MAX_CHARS = 2000   # upper bound for a single chunk
+CHUNK_MIN_CHARS = 200    # paragraphs shorter than this are merged with their neighbours
+
+# BM25 parameters
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+HEADING_PATTERN = re.compile(r"^#{1,6}\s", re.MULTILINE)
+WORD_PATTERN = re.compile(r"[a-z0-9]+(?:['\-][a-z0-9]+)*")
+STOPWORDS = frozenset(
+    "a an and are as at be but by for from has have how i in is it its of on or that the this to was "
+    "what when where which who why will with".split()
+)
+
+def tokenize(text):
+    """
+    Lowercase word tokens with common English stopwords removed.
+    """
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+def _split_long(text, max_chars):
+    """
+    Hard-split a block that has no paragraph breaks, preferring sentence or word boundaries.
+    """
+    pieces = []
+    while len(text) > max_chars:
+        cut = text.rfind(". ", 0, max_chars)
+        if cut < max_chars // 2:
+            cut = text.rfind(" ", 0, max_chars)
+        if cut < max_chars // 2:
+            cut = max_chars - 1
+        pieces.append(text[:cut + 1].strip())
+        text = text[cut + 1:]
+    if text.strip():
+        pieces.append(text.strip())
+    return pieces
+
+def split_into_chunks(text, max_chars=CHUNK_MAX_CHARS):
+    """
+    Split page text (e.g. Jina markdown) into sections at markdown headings, then into paragraph groups
+    of at most max_chars. Returns the chunks in document order.
+    """
+    if not text:
+        return []
+    starts = [match.start() for match in HEADING_PATTERN.finditer(text)]
+    if not starts or starts[0] != 0:
+        starts.insert(0, 0)
+    sections = [text[start:end] for start, end in zip(starts, starts[1:] + [len(text)])]
+
+    chunks = []
+    for section in sections:
+        section = section.strip()
+        if not section:
+            continue
+        if len(section) <= max_chars:
+            chunks.append(section)
+            continue
+        current = ""
+        for paragraph in re.split(r"\n\s*\n", section):
+            paragraph = paragraph.strip()
+            if not paragraph:
+                continue
+            if len(paragraph) > max_chars:
+                if current:
+                    chunks.append(current)
+                    current = ""
+                chunks.extend(_split_long(paragraph, max_chars))
+            elif len(current) + len(paragraph) + 2 > max_chars and len(current) >= CHUNK_MIN_CHARS:
+                chunks.append(current)
+                current = paragraph
+            else:
+                current = f"{current}\n\n{paragraph}" if current else paragraph
+        if current:
+            chunks.append(current)
+    return chunks
+
+def bm25_scores(chunks, query):
+    """
+    Score each chunk against the query with BM25, treating the chunks of one page as the corpus.
+    """
+    query_terms = set(tokenize(query))
+    documents = [tokenize(chunk) for chunk in chunks]
+    if not documents or not query_terms:
+        return [0.0] * len(chunks)
+    average_length = sum(len(doc) for doc in documents) / len(documents) or 1.0
+    document_frequency = Counter()
+    for doc in documents:
+        document_frequency.update(query_terms.intersection(doc))
+
+    scores = []
+    for doc in documents:
+        counts = Counter(doc)
+        length_norm = BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / average_length)
+        score = 0.0
+        for term in query_terms:
+            frequency = counts.get(term, 0)
+            if not frequency:
+                continue
+            idf = math.log(1 + (len(documents) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            score += idf * frequency * (BM25_K1 + 1) / (frequency + length_norm)
+        scores.append(score)
+    return scores
+
+def select_chunks(chunks, queries, token_budget, top_k, estimate_tokens):
+    """
+    Rank chunks by their summed BM25 score against the given queries and keep the best ones
+    (at most top_k, within token_budget estimated tokens). Returns the selection in document order.
+    The first chunk is used when nothing matches, so pages without query terms still get a sample.
+    """
+    if not chunks:
+        return []
+    totals = [0.0] * len(chunks)
+    for query in queries:
+        if query:
+            for index, score in enumerate(bm25_scores(chunks, query)):
+                totals[index] += score
+
+    ranked = sorted(range(len(chunks)), key=lambda index: (-totals[index], index))
+    selected = []
+    used = 0
+    for index in ranked:
+        if len(selected) >= top_k:
+            break
+        if totals[index] <= 0 and selected:
+            break
+        tokens = estimate_tokens(chunks[index])
+        if used + tokens > token_budget:
+            continue
+        selected.append(index)
+        used += tokens
+    if not selected:
+        return [chunks[0][:token_budget * 4]]
+    return [chunks[index] for index in sorted(selected)]
@@ -0,0 +1,162 @@
+import asyncio
+import time
+from collections import deque
+
+# Per-stage timeouts in seconds; each is further capped by the time left before the run deadline
+STAGE_TIMEOUTS = {
+    "search": 30,
+    "fetch": 45,
+    "relevance": 60,
+    "extract": 120,
+    "summary": 90,
+    "planning": 60,
+    "report": 600,
+}
+# Time kept back at the end of a run for synthesizing and writing the report
+REPORT_RESERVE_SECONDS = 90
+
+# Hedged requests: a duplicate is sent once a request runs longer than the recent p95 latency
+HEDGE_ENABLED = True
+HEDGE_MIN_SAMPLES = 20        # latencies needed before hedging starts
+HEDGE_MIN_DELAY = 1.0         # never hedge sooner than this many seconds
+HEDGE_MAX_FRACTION = 0.1      # at most this fraction of requests may be duplicated
+LATENCY_WINDOW = 200          # recent samples used for the percentile
+
+class Deadline:
+    """
+    Wall-clock budget for one research run. A Deadline(None) never expires.
+    """
+    def __init__(self, seconds=None, reserve=REPORT_RESERVE_SECONDS):
+        self.started_at = time.time()
+        self.expires_at = time.monotonic() + seconds if seconds else None
+        self.reserve = min(reserve, seconds / 3) if seconds else reserve
+
+    def remaining(self):
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def research_time_left(self):
+        """
+        Seconds left for searching and extracting before the report reserve begins, or None if unbounded.
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return None
+        return max(0.0, remaining - self.reserve)
+
+    def should_wrap_up(self):
+        left = self.research_time_left()
+        return left is not None and left <= 0
+
+    def stage_timeout(self, stage):
+        """
+        Timeout for one call of a stage: the configured stage timeout, capped by the time left.
+        """
+        timeout = STAGE_TIMEOUTS.get(stage)
+        left = self.remaining() if stage == "report" else self.research_time_left()
+        if left is None:
+            return timeout
+        left = max(left, 0.1)
+        return min(timeout, left) if timeout else left
+
+async def run_with_timeout(awaitable, timeout, default, label):
+    """
+    Await with a timeout, returning `default` (and logging) instead of raising when it expires.
+    """
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        print(f"{label} timed out after {timeout:.1f}s.")
+        return default
+
+async def stream_with_timeout(chunks, timeout, default, label):
+    """
+    Re-yield an async generator's chunks until `timeout` seconds have passed in total; when it expires,
+    the generator is stopped, `default` is yielded and the stream ends.
+    """
+    expires_at = time.monotonic() + timeout if timeout is not None else None
+    try:
+        while True:
+            left = max(0.0, expires_at - time.monotonic()) if expires_at is not None else None
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), left)
+            except StopAsyncIteration:
+                return
+            except asyncio.TimeoutError:
+                print(f"{label} timed out after {timeout:.1f}s.")
+                yield default
+                return
+            yield chunk
+    finally:
+        await chunks.aclose()
+
+class LatencyTracker:
+    """
+    Sliding window of request latencies used to choose the hedging delay.
+    """
+    def __init__(self):
+        self.samples = deque(maxlen=LATENCY_WINDOW)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def record(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, fraction):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def hedge_delay(self):
+        """
+        Delay after which a duplicate request should be fired, or None when hedging is not allowed.
+        """
+        if not HEDGE_ENABLED or len(self.samples) < HEDGE_MIN_SAMPLES:
+            return None
+        if self.hedges >= HEDGE_MAX_FRACTION * self.calls:
+            return None
+        return max(HEDGE_MIN_DELAY, self.percentile(0.95))
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "p50": self.percentile(0.5),
+            "p95": self.percentile(0.95),
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+        }
+
+async def hedged(make_call, tracker):
+    """
+    Run make_call(); if it is still running after the tracker's p95-based delay, start a duplicate and
+    return the first truthy result. Falsy results (failed fetches) only win once every attempt finished.
+    """
+    tracker.calls += 1
+    started = time.monotonic()
+    delay = tracker.hedge_delay()
+    tasks = [asyncio.ensure_future(make_call())]
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done:
+                tracker.hedges += 1
+                tasks.append(asyncio.ensure_future(make_call()))
+        pending = set(tasks)
+        result = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.result()
+                if result:
+                    if task is not tasks[0]:
+                        tracker.hedge_wins += 1
+                    return result
+        return result
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+        tracker.record(time.monotonic() - started)
@@ -0,0 +1,132 @@
+import hashlib
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# Near-duplicate detection settings
+SIMHASH_BITS = 64
+SHINGLE_SIZE = 3                 # words per shingle
+NEAR_DUPLICATE_DISTANCE = 3      # max Hamming distance between fingerprints of near-duplicate pages
+MIN_FINGERPRINT_WORDS = 50       # pages shorter than this are never treated as duplicates
+FINGERPRINT_MAX_WORDS = 3000     # only the start of a page is fingerprinted; keeps simhash cheap on the event loop
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+TRACKING_PARAMS = frozenset([
+    "fbclid", "gclid", "dclid", "msclkid", "yclid", "mc_cid", "mc_eid", "igshid", "ref", "ref_src",
+    "cmpid", "ncid", "sr_share", "share", "spm", "_hsenc", "_hsmi", "amp", "outputtype",
+])
+TRACKING_PREFIXES = ("utm_", "pk_", "hsa_")
+WORD_PATTERN = re.compile(r"\w+")
+
+def canonicalize_url(url):
+    """
+    Normalize a URL so that different spellings of the same page compare equal.
+    Lowercases the scheme and host, drops "www."/"amp." prefixes, default ports, fragments, tracking
+    parameters and AMP path suffixes, and sorts the remaining query parameters.
+    """
+    if not url:
+        return url
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    for prefix in ("www.", "amp."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    port = parts.port
+    netloc = host
+    if port and DEFAULT_PORTS.get(scheme) != port:
+        netloc = f"{host}:{port}"
+
+    path = parts.path or "/"
+    for suffix in ("/amp/", "/amp", ".amp"):
+        if path.endswith(suffix):
+            path = path[:-len(suffix)] or "/"
+            break
+    if path.startswith("/amp/"):
+        path = path[4:]
+    if len(path) > 1 and path.endswith("/"):
+        path = path.rstrip("/") or "/"
+
+    query_items = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    ]
+    query = urlencode(sorted(query_items))
+    return urlunsplit((scheme, netloc, path, query, ""))
+
+def shingles(text, size=SHINGLE_SIZE, max_words=None):
+    """
+    Set of lowercase word n-grams of the text (of its first max_words words, if given).
+    """
+    words = WORD_PATTERN.findall(text.lower())
+    if max_words is not None:
+        words = words[:max_words]
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[index:index + size]) for index in range(len(words) - size + 1)}
+
+def simhash(text, max_words=FINGERPRINT_MAX_WORDS):
+    """
+    64-bit SimHash fingerprint over the word shingles of the text's first max_words words.
+    Bits are counted column-wise over the shingle hashes' binary strings rather than bit by bit per shingle.
+    """
+    hashes = [
+        format(int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"),
+               f"0{SIMHASH_BITS}b")
+        for shingle in shingles(text, max_words=max_words)
+    ]
+    fingerprint = 0
+    # Column 0 of the binary strings is the most significant bit
+    for column, bits in enumerate(zip(*hashes)):
+        if 2 * bits.count("1") > len(hashes):
+            fingerprint |= 1 << (SIMHASH_BITS - 1 - column)
+    return fingerprint
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+class RunDeduplicator:
+    """
+    Run-level record of canonical URLs already queued and fingerprints of pages already fetched.
+    Fingerprints are indexed in bands so that any pair within NEAR_DUPLICATE_DISTANCE shares a band
+    (pigeonhole), which keeps lookups cheap as the run grows.
+    """
+    def __init__(self, max_distance=NEAR_DUPLICATE_DISTANCE):
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self.band_bits = SIMHASH_BITS // self.band_count
+        self.seen_urls = set()
+        self.bands = [dict() for _ in range(self.band_count)]
+        self.url_duplicates = 0
+        self.content_duplicates = 0
+
+    def claim_url(self, url):
+        """
+        Return True the first time a (canonicalized) URL is seen in the run, False afterwards.
+        """
+        key = canonicalize_url(url)
+        if key in self.seen_urls:
+            self.url_duplicates += 1
+            return False
+        self.seen_urls.add(key)
+        return True
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(fingerprint >> (band * self.band_bits)) & mask for band in range(self.band_count)]
+
+    def is_near_duplicate(self, text):
+        """
+        Return True if the text nearly duplicates a page seen earlier in the run; otherwise remember it.
+        """
+        if len(WORD_PATTERN.findall(text)) < MIN_FINGERPRINT_WORDS:
+            return False
+        fingerprint = simhash(text)
+        keys = self._band_keys(fingerprint)
+        for band, key in enumerate(keys):
+            for other in self.bands[band].get(key, ()):
+                if hamming_distance(fingerprint, other) <= self.max_distance:
+                    self.content_duplicates += 1
+                    return True
+        for band, key in enumerate(keys):
+            self.bands[band].setdefault(key, []).append(fingerprint)
+        return False
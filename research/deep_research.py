@@ -1,7 +1,24 @@
 import asyncio
-import aiohttp
+import codecs
+import contextlib
+import contextvars
 import json
+import time
 import nest_asyncio
+from research import cache
+from research import checkpoint as checkpoints
+from research import chunking
+from research import deadlines
+from research import dedup
+from research import fetchers
+from research import http_client
+from research import knowledge
+from research import novelty
+from research import prefilter
+from research import routing
+from research.pipeline import Pipeline
+from research import scheduler
+from research import tracing
 nest_asyncio.apply()
 
 # API Endpoints
@@ -9,22 +26,175 @@ OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
 SERPAPI_URL = "https://serpapi.com/search"
 JINA_BASE_URL = "https://r.jina.ai/"
 
-# Modify the default model selection
-DEFAULT_MODEL = "google/gemini-2.0-flash-lite-preview-02-05:free"  # Gemini Flash 2.0 model identifier
+# API keys. A single-user process can set these module globals; code serving several users wraps each run
+# in use_api_keys() so concurrent runs on one event loop each send (and are billed to) their own keys.
+OPENROUTER_API_KEY = None
+SERPAPI_API_KEY = None
+JINA_API_KEY = None
+_api_keys = contextvars.ContextVar("deep_research_api_keys", default=None)
+
+# Modify the default model selection; per-stage models and cascade routing live in research/routing.py
+DEFAULT_MODEL = routing.DEFAULT_MODEL
+
+NO_QUERIES_MESSAGE = "No search queries were generated by the LLM. Terminating process."
+REPORT_ERROR_MESSAGE = "Error occurred while generating the report."
+REPORT_TRUNCATED_MESSAGE = "\n\n**[Report generation was interrupted; the report above is incomplete.]**\n"
+
+# Streaming pipeline settings
+PIPELINE_QUEUE_SIZE = 32       # bounded queue between stages; applies backpressure to the search stage
+FETCH_WORKERS = 10
+RELEVANCE_WORKERS = 8
+EXTRACT_WORKERS = 8
+PLANNING_MIN_CONTEXTS = 5      # contexts from the current round that allow planning before stragglers finish
+PLANNING_MIN_FRACTION = 0.8    # fraction of the round's links that must be done before planning early
+
+# Planning prompt budgets (estimated tokens)
+PLANNING_TOKEN_BUDGET = 8000          # hard cap on the whole get_new_search_queries_async prompt
+RESEARCH_SUMMARY_TOKEN_BUDGET = 3000  # target size of the running research summary
+SUMMARY_UPDATE_TOKEN_BUDGET = 6000    # new material sent to a single summary update
+
+# Report synthesis budgets (estimated tokens)
+REPORT_CONTEXT_TOKEN_BUDGET = 24000   # context handed to the final report prompt
+SYNTHESIS_GROUP_TOKEN_BUDGET = 8000   # input size of one map-step summarization
+SYNTHESIS_NOTES_MAX_TOKENS = 1500     # output size of one map-step summarization
+SYNTHESIS_MAX_LEVELS = 3              # reduce passes before the remaining notes are truncated
+
+# Long-page handling: pages are split into sections and only the best-ranked ones reach the LLM
+RELEVANCE_TOKEN_BUDGET = 2500     # excerpt size for the Yes/No relevance verdict
+RELEVANCE_TOP_K = 6
+EXTRACTION_TOKEN_BUDGET = 10000   # total section text considered for extraction
+EXTRACTION_TOP_K = 16
+EXTRACTION_BATCH_TOKENS = 4000    # sections per parallel extraction request
+
+# Batched relevance classification: several pages judged in one request
+RELEVANCE_BATCHING_ENABLED = True
+RELEVANCE_BATCH_MAX_PAGES = 8
+RELEVANCE_BATCH_TOKEN_BUDGET = 10000   # total excerpt tokens in one batch request
+RELEVANCE_BATCH_EXCERPT_TOKENS = 1200  # excerpt size per page in a batch
+RELEVANCE_BATCH_LINGER = 0.3           # seconds to wait for more pages before sending a partial batch
+
+# Page ingestion limits: page bodies are streamed and reading stops at whichever cap is hit first.
+# Only the best-ranked sections (EXTRACTION_TOKEN_BUDGET) ever reach the LLM, so a long prefix is enough to rank.
+PAGE_MAX_BYTES = 2_000_000      # hard cap on bytes read from one response
+PAGE_MAX_CHARS = 120_000        # enough text collected; stop reading
+PAGE_READ_CHUNK_BYTES = 65536
+
+# HTTP client timeouts (seconds); connection pools are configured in research/http_client.py and
+# overall run deadlines and per-stage timeouts live in research/deadlines.py
+HTTP_TIMEOUT = http_client.HTTP_TIMEOUT
+LONG_GENERATION_PURPOSES = ("synthesis", "report")   # calls that get http_client.GENERATION_TIMEOUT
+
+# Recent Jina fetch latencies, used to decide when to hedge a slow fetch
+FETCH_LATENCY = deadlines.LatencyTracker()
+
+@contextlib.contextmanager
+def use_api_keys(api_keys):
+    """
+    Use api_keys (a dict with "openrouter", "serpapi" and "jina" keys) for requests made inside the block,
+    including tasks it creates.
+    """
+    token = _api_keys.set(api_keys)
+    try:
+        yield api_keys
+    finally:
+        _api_keys.reset(token)
+
+def api_key(provider):
+    """
+    The key for provider ("openrouter", "serpapi" or "jina"): from use_api_keys() if active, else the module global.
+    """
+    api_keys = _api_keys.get()
+    if api_keys is not None:
+        return api_keys[provider]
+    return {"openrouter": OPENROUTER_API_KEY, "serpapi": SERPAPI_API_KEY, "jina": JINA_API_KEY}[provider]
+
+def estimate_tokens(text):
+    """
+    Cheap token estimate (about four characters per token) used for rate limiting and prompt budgets.
+    """
+    return len(text) // 4 + 1
+
+def truncate_to_tokens(text, budget, keep_end=False):
+    """
+    Cut text down to roughly `budget` estimated tokens, keeping the start (or the end if keep_end).
+    """
+    if estimate_tokens(text) <= budget:
+        return text
+    max_chars = max(0, budget * 4)
+    return text[-max_chars:] if keep_end else text[:max_chars]
 
 # Helper class to hold extracted content along with its source URL
 class SourcedContext:
+    __slots__ = ("text", "source_url")
+
     def __init__(self, text, source_url):
         self.text = text
         self.source_url = source_url
 
-async def call_openrouter_async(session, messages, model=DEFAULT_MODEL):
+# A link moving through the fetch -> relevance -> extract pipeline
+class LinkJob:
+    __slots__ = ("link", "search_query", "iteration", "page_text", "chunks", "context", "duplicate", "interrupted")
+
+    def __init__(self, link, search_query, iteration=0):
+        self.link = link
+        self.search_query = search_query
+        self.iteration = iteration
+        self.page_text = None
+        self.chunks = None
+        self.context = None
+        self.duplicate = False
+        self.interrupted = False   # dropped by a deadline, timeout or error rather than judged irrelevant
+
+# Progress of one research round, used to decide when planning may start
+class RoundProgress:
+    def __init__(self):
+        self.searches_done = False
+        self.submitted = 0
+        self.finished = 0
+        self.contexts = 0
+        self.duplicate_urls = 0
+        self.duplicate_pages = 0
+
+    def ready_for_planning(self):
+        if not self.searches_done:
+            return False
+        if self.finished >= self.submitted:
+            return True
+        return (self.contexts >= PLANNING_MIN_CONTEXTS
+                and self.finished >= PLANNING_MIN_FRACTION * self.submitted)
+
+def record_llm_call(model, started, usage=None, ok=True):
+    """
+    Record one OpenRouter call in the per-model stats and on the current trace span.
+    """
+    routing.STATS.record_call(model, time.monotonic() - started, usage, ok)
+    usage = usage or {}
+    tracing.add(
+        llm_calls=1,
+        prompt_tokens=usage.get("prompt_tokens") or 0,
+        completion_tokens=usage.get("completion_tokens") or 0
+    )
+
+async def call_openrouter_async(session, messages, model=None, temperature=0.7, max_tokens=4096, purpose=None):
     """
     Make an asynchronous request to the OpenRouter chat completion API with the given messages.
     Returns the assistant's reply text.
+    model: Model identifier; defaults to the stage model configured for `purpose`
+    purpose: Name of the call site (e.g. "relevance", "report"); selects the model and whether the response cache is used
     """
+    if model is None:
+        model = routing.model_for(purpose)
+    llm_cache = cache.get_llm_cache()
+    cache_key = None
+    if llm_cache is not None and llm_cache.allows(purpose):
+        cache_key = llm_cache.make_key(model, messages, temperature, max_tokens)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            tracing.add(cache_hits=1)
+            return cached
+
     headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
+        "Authorization": f"Bearer {api_key('openrouter')}",
         "HTTP-Referer": "https://github.com/Pygen",  
         "X-Title": "Research Assistant",  
         "Content-Type": "application/json"
@@ -33,27 +203,157 @@ async def call_openrouter_async(session, messages, model=DEFAULT_MODEL):
     payload = {
         "model": model,
         "messages": messages,
-        "temperature": 0.7,
-        "max_tokens": 4096
+        "temperature": temperature,
+        "max_tokens": max_tokens
     }
     
+    prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+    timeout = http_client.GENERATION_TIMEOUT if purpose in LONG_GENERATION_PURPOSES else HTTP_TIMEOUT
+    started = time.monotonic()
     try:
-        async with session.post(OPENROUTER_URL, headers=headers, json=payload) as resp:
-            if resp.status == 200:
-                result = await resp.json()
-                try:
-                    return result['choices'][0]['message']['content']
-                except (KeyError, IndexError) as e:
-                    print("Unexpected response structure from OpenRouter:", result)
-                    return None
-            else:
-                text = await resp.text()
-                print(f"OpenRouter API error: {resp.status} - {text}")
+        status, text = await scheduler.request_with_retries(
+            "openrouter",
+            lambda: session.post(OPENROUTER_URL, headers=headers, json=payload, timeout=timeout),
+            tokens=prompt_tokens
+        )
+        if status == 200:
+            result = json.loads(text)
+            try:
+                content = result['choices'][0]['message']['content']
+            except (KeyError, IndexError) as e:
+                print("Unexpected response structure from OpenRouter:", result)
+                record_llm_call(model, started, ok=False)
                 return None
+            record_llm_call(model, started, result.get('usage'))
+            if cache_key is not None and content:
+                llm_cache.set(cache_key, content)
+            return content
+        else:
+            print(f"OpenRouter API error: {status} - {text}")
+            record_llm_call(model, started, ok=False)
+            return None
     except Exception as e:
         print("Error during OpenRouter call:", e)
+        record_llm_call(model, started, ok=False)
         return None
 
+async def call_with_cascade(session, messages, purpose, parse, **kwargs):
+    """
+    Call the models configured for a stage in order (small model first in cascade mode) until
+    parse(response) returns something other than None; unparseable or unsure answers escalate.
+    Returns (parsed, last_response); parsed is None if no model produced a usable answer.
+    """
+    response = None
+    models = routing.models_for(purpose)
+    for index, model in enumerate(models):
+        response = await call_openrouter_async(session, messages, model=model, purpose=purpose, **kwargs)
+        parsed = parse(response) if response else None
+        if parsed is not None:
+            return parsed, response
+        if index < len(models) - 1:
+            routing.STATS.record_escalation(model)
+            print(f"Escalating {purpose} call from {model} to {models[index + 1]}.")
+    return None, response
+
+async def stream_openrouter_async(session, messages, model=None, temperature=0.7, max_tokens=4096, usage_out=None):
+    """
+    Make a streaming (server-sent events) request to the OpenRouter chat completion API.
+    Yields the assistant's reply text in deltas as they arrive; yields nothing if the request fails.
+    usage_out: Optional dict updated with the `usage` block OpenRouter sends at the end of the stream,
+    and with "ok": whether the stream ran to completion (False if it failed or broke off part way)
+    """
+    if model is None:
+        model = routing.model_for("report")
+    headers = {
+        "Authorization": f"Bearer {api_key('openrouter')}",
+        "HTTP-Referer": "https://github.com/Pygen",
+        "X-Title": "Research Assistant",
+        "Content-Type": "application/json"
+    }
+    payload = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "stream": True
+    }
+    prompt_tokens = sum(estimate_tokens(m.get("content", "")) for m in messages)
+    limiter = scheduler.get_limiter("openrouter")
+    started = time.monotonic()
+    usage = None
+    ok = False
+    try:
+        async with limiter.slot(prompt_tokens):
+            async with session.post(OPENROUTER_URL, headers=headers, json=payload) as resp:
+                if resp.status != 200:
+                    text = await resp.text()
+                    print(f"OpenRouter streaming error: {resp.status} - {text}")
+                    return
+                async for raw_line in resp.content:
+                    line = raw_line.decode("utf-8").strip()
+                    # Blank lines separate events; lines starting with ':' are keep-alive comments
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        ok = True
+                        return
+                    try:
+                        chunk = json.loads(data)
+                        usage = chunk.get('usage') or usage
+                        if not chunk.get('choices'):
+                            continue
+                        delta = chunk['choices'][0].get('delta', {}).get('content')
+                    except (json.JSONDecodeError, KeyError, IndexError, AttributeError):
+                        print("Unexpected streaming chunk from OpenRouter:", data)
+                        continue
+                    if delta:
+                        yield delta
+                ok = True
+    except Exception as e:
+        print("Error during OpenRouter streaming call:", e)
+    finally:
+        record_llm_call(model, started, usage, ok)
+        if usage_out is not None:
+            usage_out.update(usage or {})
+            usage_out["ok"] = ok
+
+def parse_query_list(response):
+    """
+    Parse a Python list of query strings from an LLM reply, tolerating code fences.
+    Returns the list, or None if the reply is not a non-empty list.
+    """
+    try:
+        cleaned_response = response.strip()
+        if cleaned_response.startswith("```"):
+            cleaned_response = cleaned_response.split("```")[1]
+            if cleaned_response.startswith("python"):
+                cleaned_response = cleaned_response[6:]
+        cleaned_response = cleaned_response.strip()
+        
+        search_queries = eval(cleaned_response)
+    except Exception:
+        return None
+    if isinstance(search_queries, list) and search_queries:
+        return search_queries
+    return None
+
+def parse_relevance_verdict(response, strict=True):
+    """
+    Read a Yes/No relevance verdict. In strict mode anything other than a bare "Yes" or "No" is treated
+    as unsure and returns None; otherwise the first recognizable verdict in the text is used.
+    """
+    answer = response.strip().rstrip(".")
+    if answer in ["Yes", "No"]:
+        return answer
+    if strict:
+        return None
+    if "Yes" in answer:
+        return "Yes"
+    elif "No" in answer:
+        return "No"
+    return None
+
 async def generate_search_queries_async(session, user_query):
     """
     Use the LLM to produce up to four clear search queries based on the user's topic.
@@ -68,25 +368,11 @@ async def generate_search_queries_async(session, user_query):
         {"role": "system", "content": "You are a precise and supportive research assistant."},
         {"role": "user", "content": f"User Topic: {user_query}\n\n{prompt}"}
     ]
-    response = await call_openrouter_async(session, messages)
+    search_queries, response = await call_with_cascade(session, messages, "queries", parse_query_list)
+    if search_queries is not None:
+        return search_queries
     if response:
-        try:
-            cleaned_response = response.strip()
-            if cleaned_response.startswith("```"):
-                cleaned_response = cleaned_response.split("```")[1]
-                if cleaned_response.startswith("python"):
-                    cleaned_response = cleaned_response[6:]
-            cleaned_response = cleaned_response.strip()
-            
-            search_queries = eval(cleaned_response)
-            if isinstance(search_queries, list):
-                return search_queries
-            else:
-                print("The LLM response is not a list. Response:", response)
-                return []
-        except Exception as e:
-            print("Error interpreting search queries:", e, "\nResponse:", response)
-            return []
+        print("Error interpreting search queries. Response:", response)
     return []
 
 # Modify perform_search_async function
@@ -97,52 +383,156 @@ async def perform_search_async(session, query, result_limit=5):
     """
     params = {
         "q": query,
-        "api_key": SERPAPI_API_KEY,
+        "api_key": api_key("serpapi"),
         "engine": "google",
         "num": result_limit  # Add this parameter for limiting results
     }
     try:
-        async with session.get(SERPAPI_URL, params=params) as resp:
-            if resp.status == 200:
-                results = await resp.json()
-                if "organic_results" in results:
-                    links = [item.get("link") for item in results["organic_results"] if "link" in item]
-                    return links[:result_limit]  # Ensure we don't exceed the limit
-                else:
-                    print("No organic results found in SERPAPI response.")
-                    return []
+        status, text = await scheduler.request_with_retries(
+            "serpapi", lambda: session.get(SERPAPI_URL, params=params)
+        )
+        if status == 200:
+            results = json.loads(text)
+            if "organic_results" in results:
+                links = [item.get("link") for item in results["organic_results"] if "link" in item]
+                return links[:result_limit]  # Ensure we don't exceed the limit
             else:
-                text = await resp.text()
-                print(f"SERPAPI error: {resp.status} - {text}")
+                print("No organic results found in SERPAPI response.")
                 return []
+        else:
+            print(f"SERPAPI error: {status} - {text}")
+            return []
     except Exception as e:
         print("Error during SERPAPI search:", e)
         return []
 
-async def fetch_webpage_text_async(session, url):
+async def read_page_text(resp, max_bytes=None, max_chars=None):
     """
-    Fetch the textual content of a webpage asynchronously using the Jina service.
+    Stream a response body and decode it incrementally, stopping once max_bytes have been read or
+    max_chars of text collected, so a huge page never has to sit in memory as a whole.
+    """
+    max_bytes = max_bytes or PAGE_MAX_BYTES
+    max_chars = max_chars or PAGE_MAX_CHARS
+    decoder = codecs.getincrementaldecoder(resp.charset or "utf-8")(errors="replace")
+    parts = []
+    bytes_read = 0
+    chars = 0
+    async for block in resp.content.iter_chunked(PAGE_READ_CHUNK_BYTES):
+        bytes_read += len(block)
+        text = decoder.decode(block)
+        parts.append(text)
+        chars += len(text)
+        if bytes_read >= max_bytes or chars >= max_chars:
+            print(f"Stopped reading {resp.url} after {bytes_read} bytes ({chars} characters)")
+            tracing.set_attributes(truncated=True)
+            break
+    else:
+        parts.append(decoder.decode(b"", final=True))
+    return "".join(parts)[:max_chars]
+
+async def fetch_from_jina_async(session, url):
+    """
+    Download a page's text through the Jina reader, reading at most PAGE_MAX_BYTES / PAGE_MAX_CHARS.
+    Returns "" on failure.
     """
     full_url = f"{JINA_BASE_URL}{url}"
     headers = {
-        "Authorization": f"Bearer {JINA_API_KEY}"
+        "Authorization": f"Bearer {api_key('jina')}"
     }
     try:
-        async with session.get(full_url, headers=headers) as resp:
-            if resp.status == 200:
-                return await resp.text()
-            else:
-                text = await resp.text()
-                print(f"Jina fetch error for {url}: {resp.status} - {text}")
-                return ""
+        status, text = await scheduler.request_with_retries(
+            "jina", lambda: session.get(full_url, headers=headers), read_body=read_page_text
+        )
+        if status == 200:
+            return text
+        else:
+            print(f"Jina fetch error for {url}: {status} - {text}")
+            return ""
     except Exception as e:
         print("Error retrieving webpage text with Jina:", e)
         return ""
 
-async def is_page_useful_async(session, user_query, page_text):
+async def fetch_local_async(session, url):
+    """
+    Download a page directly and convert its HTML to text in-process (research/fetchers.py).
+    Returns "" on failure or when too little text could be extracted.
+    """
+    async def read_body(resp):
+        return await fetchers.read_html_text(resp, PAGE_MAX_BYTES, PAGE_MAX_CHARS, PAGE_READ_CHUNK_BYTES)
+
+    try:
+        status, text = await scheduler.request_with_retries(
+            "web", lambda: session.get(url, headers=fetchers.LOCAL_HEADERS), read_body=read_body
+        )
+    except Exception as e:
+        print(f"Error downloading {url} directly:", e)
+        return ""
+    if status != 200:
+        print(f"Direct fetch error for {url}: {status}")
+        return ""
+    if len(text) < fetchers.LOCAL_MIN_TEXT_CHARS:
+        print(f"Local extraction of {url} produced only {len(text)} characters")
+        return ""
+    return text
+
+async def fetch_from_jina_hedged(session, url):
+    """
+    Jina fetch, hedged: a duplicate request is sent once the fetch exceeds the recent p95 latency.
+    """
+    return await deadlines.hedged(lambda: fetch_from_jina_async(session, url), FETCH_LATENCY)
+
+# Fetch backends by name; each is an async function (session, url) returning the page text or "" on failure.
+# fetchers.DOMAIN_BACKENDS chooses the backend per domain.
+FETCH_BACKENDS = {
+    "jina": fetch_from_jina_hedged,
+    "local": fetch_local_async,
+}
+
+async def fetch_webpage_text_async(session, url):
+    """
+    Fetch the textual content of a webpage asynchronously with the backend configured for its domain
+    (the Jina service by default), falling back to Jina when a local extraction fails.
+    Pages are served from the shared disk cache when a fresh copy is available.
+    """
+    page_cache = cache.get_page_cache()
+    cache_key = dedup.canonicalize_url(url)
+    if page_cache is not None:
+        cached = page_cache.get(cache_key)
+        if cached is not None:
+            tracing.add(cache_hits=1)
+            return cached
+
+    backend = fetchers.backend_for(url)
+    text = await FETCH_BACKENDS[backend](session, url)
+    fetchers.STATS.record(backend, bool(text))
+    tracing.set_attributes(backend=backend)
+    if not text and backend != fetchers.FALLBACK_BACKEND:
+        print(f"Falling back to {fetchers.FALLBACK_BACKEND} for {url}")
+        fetchers.STATS.record_fallback()
+        tracing.set_attributes(backend=fetchers.FALLBACK_BACKEND, fallback=True)
+        text = await FETCH_BACKENDS[fetchers.FALLBACK_BACKEND](session, url)
+        fetchers.STATS.record(fetchers.FALLBACK_BACKEND, bool(text))
+    if page_cache is not None and text:
+        page_cache.set(cache_key, text)
+    return text
+
+def select_page_excerpt(page_text, queries, token_budget, top_k, chunks=None):
+    """
+    Return the page's most query-relevant chunks (BM25 ranked, in document order) within the token budget.
+    chunks: Pre-split chunks of page_text, to avoid splitting the same page twice
+    """
+    if chunks is None:
+        chunks = chunking.split_into_chunks(page_text)
+    return chunking.select_chunks(chunks, queries, token_budget, top_k, estimate_tokens)
+
+async def is_page_useful_async(session, user_query, page_text, chunks=None):
     """
     Request the LLM to determine if the provided webpage content is pertinent to answering the user's topic.
+    Only the sections that rank highest against the topic are sent, within RELEVANCE_TOKEN_BUDGET.
     """
+    excerpt = "\n\n".join(select_page_excerpt(
+        page_text, [user_query], RELEVANCE_TOKEN_BUDGET, RELEVANCE_TOP_K, chunks
+    ))
     prompt = (
         "You are a discerning evaluator of research. Given the user's topic and a snippet of webpage content, "
         "decide if the page contains valuable information to address the query. "
@@ -150,43 +540,239 @@ async def is_page_useful_async(session, user_query, page_text):
     )
     messages = [
         {"role": "system", "content": "You are a concise and strict research relevance evaluator."},
-        {"role": "user", "content": f"User Topic: {user_query}\n\nWebpage Snippet (up to 20000 characters):\n{page_text[:20000]}\n\n{prompt}"}
+        {"role": "user", "content": f"User Topic: {user_query}\n\nMost Relevant Webpage Sections:\n{excerpt}\n\n{prompt}"}
     ]
-    response = await call_openrouter_async(session, messages)
-    if response:
-        answer = response.strip()
-        if answer in ["Yes", "No"]:
-            return answer
-        else:
-            if "Yes" in answer:
-                return "Yes"
-            elif "No" in answer:
-                return "No"
-    return "No"
+    verdict, response = await call_with_cascade(session, messages, "relevance", parse_relevance_verdict)
+    if verdict is None and response:
+        verdict = parse_relevance_verdict(response, strict=False)
+    return verdict or "No"
 
-async def extract_relevant_context_async(session, user_query, search_query, page_text):
+def parse_batch_verdicts(response):
     """
-    Derive and return the important details from the webpage text to address the user's topic.
+    Parse a JSON object mapping page IDs to "Yes"/"No" out of an LLM reply. Unparseable entries are omitted.
+    """
+    cleaned = response.strip()
+    if cleaned.startswith("```"):
+        cleaned = cleaned.split("```")[1]
+        if cleaned.startswith("json"):
+            cleaned = cleaned[4:]
+    start = cleaned.find("{")
+    end = cleaned.rfind("}")
+    if start == -1 or end == -1:
+        return {}
+    try:
+        parsed = json.loads(cleaned[start:end + 1])
+    except json.JSONDecodeError:
+        return {}
+    verdicts = {}
+    for page_id, verdict in parsed.items():
+        verdict = str(verdict).strip().capitalize()
+        if verdict in ["Yes", "No"]:
+            verdicts[str(page_id)] = verdict
+    return verdicts
+
+async def classify_pages_batch_async(session, user_query, excerpts):
+    """
+    Judge several pages in one request.
+    excerpts: dict of page ID -> excerpt text
+    Returns a dict of page ID -> "Yes"/"No" for every page the model answered clearly.
+    """
+    prompt = (
+        "You are a discerning evaluator of research. For each numbered webpage snippet above, decide whether it "
+        "contains valuable information to address the user's topic. Reply with a single JSON object mapping each "
+        "page ID to \"Yes\" or \"No\", for example {\"1\": \"Yes\", \"2\": \"No\"}. Provide no extra text."
+    )
+    pages = "\n\n".join(f"=== Page {page_id} ===\n{excerpt}" for page_id, excerpt in excerpts.items())
+    messages = [
+        {"role": "system", "content": "You are a concise and strict research relevance evaluator."},
+        {"role": "user", "content": f"User Topic: {user_query}\n\n{pages}\n\n{prompt}"}
+    ]
+    def parse_complete(response):
+        verdicts = parse_batch_verdicts(response)
+        return verdicts if len(verdicts) == len(excerpts) else None
+
+    verdicts, response = await call_with_cascade(
+        session, messages, "relevance_batch", parse_complete,
+        temperature=0.0, max_tokens=20 * len(excerpts) + 50
+    )
+    if verdicts is None:
+        # Keep whatever the last model did answer; the rest fall back to single-page judging
+        return parse_batch_verdicts(response) if response else {}
+    return verdicts
+
+class RelevanceBatcher:
+    """
+    Collects concurrent relevance requests and sends them as batched classification calls.
+    A batch is flushed when it reaches RELEVANCE_BATCH_MAX_PAGES or RELEVANCE_BATCH_TOKEN_BUDGET,
+    or RELEVANCE_BATCH_LINGER seconds after its first page arrived. Pages the batch reply does not
+    answer fall back to is_page_useful_async.
+    """
+    def __init__(self, session, user_query):
+        self.session = session
+        self.user_query = user_query
+        self.batches_sent = 0
+        self.fallbacks = 0
+        self._pending = []
+        self._pending_tokens = 0
+        self._next_id = 1
+        self._timer = None
+        self._tasks = set()
+
+    async def judge(self, page_text, chunks=None):
+        excerpt = "\n\n".join(select_page_excerpt(
+            page_text, [self.user_query], RELEVANCE_BATCH_EXCERPT_TOKENS, RELEVANCE_TOP_K, chunks
+        ))
+        tokens = estimate_tokens(excerpt)
+        if self._pending and self._pending_tokens + tokens > RELEVANCE_BATCH_TOKEN_BUDGET:
+            self._flush()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((str(self._next_id), excerpt, page_text, chunks, future))
+        self._next_id += 1
+        self._pending_tokens += tokens
+        if len(self._pending) >= RELEVANCE_BATCH_MAX_PAGES:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(RELEVANCE_BATCH_LINGER, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_tokens = self._pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def close(self):
+        """
+        Cancel batches still being classified and pages still waiting for a batch, e.g. when the run ends early.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        for _, _, _, _, future in self._pending:
+            future.cancel()
+        self._pending, self._pending_tokens = [], 0
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _send(self, batch):
+        verdicts = {}
+        try:
+            if len(batch) > 1:
+                self.batches_sent += 1
+                verdicts = await classify_pages_batch_async(
+                    self.session, self.user_query, {page_id: excerpt for page_id, excerpt, _, _, _ in batch}
+                )
+        except Exception as e:
+            print("Batched relevance classification failed:", e)
+
+        async def resolve(page_id, page_text, chunks, future):
+            verdict = verdicts.get(page_id)
+            if verdict is None:
+                if len(batch) > 1:
+                    self.fallbacks += 1
+                try:
+                    verdict = await is_page_useful_async(self.session, self.user_query, page_text, chunks)
+                except Exception as e:
+                    print("Single-page relevance fallback failed:", e)
+                    verdict = "No"
+            if not future.done():
+                future.set_result(verdict)
+
+        await asyncio.gather(*[
+            resolve(page_id, page_text, chunks, future) for page_id, _, page_text, chunks, future in batch
+        ])
+
+async def extract_from_sections_async(session, user_query, search_query, sections):
+    """
+    Extract the pertinent details from one batch of webpage sections.
     """
     prompt = (
         "You are an expert extractor of information. Given the user's topic, the search query that produced this page, "
         "and the webpage text, extract all pertinent details needed to answer the inquiry. "
         "Return only the relevant text without any additional commentary."
     )
+    page_sections = "\n\n".join(sections)
     messages = [
         {"role": "system", "content": "You excel at summarizing and extracting relevant details."},
-        {"role": "user", "content": f"User Topic: {user_query}\nSearch Query: {search_query}\n\nWebpage Snippet (up to 20000 characters):\n{page_text[:20000]}\n\n{prompt}"}
+        {"role": "user", "content": f"User Topic: {user_query}\nSearch Query: {search_query}\n\nWebpage Sections:\n{page_sections}\n\n{prompt}"}
     ]
-    response = await call_openrouter_async(session, messages)
+    response = await call_openrouter_async(session, messages, purpose="extraction")
     if response:
         return response.strip()
     return ""
 
+async def extract_relevant_context_async(session, user_query, search_query, page_text, chunks=None):
+    """
+    Derive and return the important details from the webpage text to address the user's topic.
+    The page is split into sections, the top EXTRACTION_TOP_K sections for the topic and search query are
+    selected within EXTRACTION_TOKEN_BUDGET, and batches of them are extracted in parallel.
+    """
+    sections = select_page_excerpt(
+        page_text, [user_query, search_query], EXTRACTION_TOKEN_BUDGET, EXTRACTION_TOP_K, chunks
+    )
+    batches = []
+    current = []
+    current_tokens = 0
+    for section in sections:
+        tokens = estimate_tokens(section)
+        if current and current_tokens + tokens > EXTRACTION_BATCH_TOKENS:
+            batches.append(current)
+            current = []
+            current_tokens = 0
+        current.append(section)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+
+    results = await asyncio.gather(*[
+        extract_from_sections_async(session, user_query, search_query, batch) for batch in batches
+    ])
+    return "\n\n".join(result for result in results if result)
+
+async def update_research_summary_async(session, user_query, summary, new_contexts):
+    """
+    Fold newly extracted contexts into the running research summary so that planning prompts stay bounded.
+    Only the new contexts are sent along with the previous summary; the LLM is skipped while everything
+    still fits in RESEARCH_SUMMARY_TOKEN_BUDGET.
+    """
+    if not new_contexts:
+        return summary
+    per_context_budget = max(100, SUMMARY_UPDATE_TOKEN_BUDGET // len(new_contexts))
+    new_material = "\n".join(truncate_to_tokens(text, per_context_budget) for text in new_contexts)
+    combined = f"{summary}\n{new_material}".strip()
+    if estimate_tokens(combined) <= RESEARCH_SUMMARY_TOKEN_BUDGET:
+        return combined
+
+    target_words = RESEARCH_SUMMARY_TOKEN_BUDGET * 3 // 4
+    prompt = (
+        "You are a meticulous research note-keeper. Merge the new findings into the existing research summary. "
+        "Keep every distinct fact, figure and open question that matters for the user's topic, drop repetition, "
+        f"and keep the result under {target_words} words. Return only the updated summary."
+    )
+    messages = [
+        {"role": "system", "content": "You maintain concise, information-dense research summaries."},
+        {"role": "user", "content": f"User Topic: {user_query}\n\nExisting Summary:\n{summary}\n\nNew Findings:\n{new_material}\n\n{prompt}"}
+    ]
+    response = await call_openrouter_async(
+        session, messages, max_tokens=RESEARCH_SUMMARY_TOKEN_BUDGET, purpose="summary"
+    )
+    if response:
+        return truncate_to_tokens(response.strip(), RESEARCH_SUMMARY_TOKEN_BUDGET)
+    print("Research summary update failed; keeping the most recent material instead.")
+    return truncate_to_tokens(combined, RESEARCH_SUMMARY_TOKEN_BUDGET, keep_end=True)
+
 async def get_new_search_queries_async(session, user_query, previous_search_queries, all_contexts):
     """
     Evaluate if additional search queries are necessary based on the current research progress.
+    The prompt is held under PLANNING_TOKEN_BUDGET: the oldest queries and the end of the context are
+    dropped if necessary before the request is sent.
     """
-    context_combined = "\n".join(all_contexts)
     prompt = (
         "You are a systematic research planner. Taking into account the original topic, prior search queries, "
         "and the extracted information from webpages, determine if more research is required. "
@@ -194,11 +780,14 @@ async def get_new_search_queries_async(session, user_query, previous_search_quer
         "(for example: ['new query1', 'new query2']). If no further research is needed, reply with an empty string."
         "\nReturn only a Python list or an empty string without extra commentary."
     )
+    previous_queries_text = truncate_to_tokens(str(previous_search_queries), PLANNING_TOKEN_BUDGET // 4, keep_end=True)
+    fixed_tokens = estimate_tokens(prompt) + estimate_tokens(user_query) + estimate_tokens(previous_queries_text) + 50
+    context_combined = truncate_to_tokens("\n".join(all_contexts), max(0, PLANNING_TOKEN_BUDGET - fixed_tokens))
     messages = [
         {"role": "system", "content": "You are methodical in planning further research steps."},
-        {"role": "user", "content": f"User Topic: {user_query}\nPrevious Queries: {previous_search_queries}\n\nCollected Context:\n{context_combined}\n\n{prompt}"}
+        {"role": "user", "content": f"User Topic: {user_query}\nPrevious Queries: {previous_queries_text}\n\nCollected Context:\n{context_combined}\n\n{prompt}"}
     ]
-    response = await call_openrouter_async(session, messages)
+    response = await call_openrouter_async(session, messages, purpose="planning")
     if response:
         cleaned = response.strip()
         if cleaned == "":
@@ -220,27 +809,32 @@ async def get_new_search_queries_async(session, user_query, previous_search_quer
             return []
     return []
 
-async def generate_final_report_async(session, user_query, sourced_contexts):
+def assign_citations(sourced_contexts):
     """
-    Construct the ultimate detailed report including proper citations and references.
+    Number each distinct source URL in order of first appearance.
+    Returns (references, cited_contexts, reference_section) where cited_contexts is a list of
+    (citation_number, "text [n]") pairs in the original order.
     """
     # Assign citation numbers to contexts based on source URL
     references = {}
     ref_number = 1
-    formatted_contexts = []
+    cited_contexts = []
     
     for ctx in sourced_contexts:
         if ctx.source_url not in references:
             references[ctx.source_url] = ref_number
             ref_number += 1
-        formatted_contexts.append(f"{ctx.text} [{references[ctx.source_url]}]")
-    
-    context_combined = "\n".join(formatted_contexts)
+        cited_contexts.append((references[ctx.source_url], f"{ctx.text} [{references[ctx.source_url]}]"))
     
     # Build the reference section
     reference_list = [f"[{num}] {url}" for url, num in sorted(references.items(), key=lambda x: x[1])]
     reference_section = "\n\nReferences:\n" + "\n".join(reference_list)
-    
+    return references, cited_contexts, reference_section
+
+def build_report_messages(user_query, context_combined):
+    """
+    Build the final report prompt around the (already cited) combined context.
+    """
     prompt = (
         "You are a proficient academic report writer. Using the compiled contexts below and the original topic, "
         "compose a comprehensive, well-organized, and in-depth report that fully addresses the inquiry. "
@@ -253,98 +847,628 @@ async def generate_final_report_async(session, user_query, sourced_contexts):
         {"role": "system", "content": "You are an expert academic report composer."},
         {"role": "user", "content": f"User Topic: {user_query}\n\nCollected Context:\n{context_combined}\n\n{prompt}"}
     ]
-    
-    report = await call_openrouter_async(session, messages)
+    return messages
+
+def group_by_token_budget(cited_texts, budget):
+    """
+    Pack (citation_number, text) pairs into groups of at most `budget` estimated tokens.
+    Texts from the same source are kept together where possible and oversized texts are truncated.
+    """
+    by_source = {}
+    for number, text in cited_texts:
+        by_source.setdefault(number, []).append(text)
+
+    groups = []
+    current = []
+    current_tokens = 0
+    for number in sorted(by_source):
+        for text in by_source[number]:
+            text = truncate_to_tokens(text, budget)
+            tokens = estimate_tokens(text)
+            if current and current_tokens + tokens > budget:
+                groups.append(current)
+                current = []
+                current_tokens = 0
+            current.append(text)
+            current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+async def summarize_context_group_async(session, user_query, texts):
+    """
+    Map step of report synthesis: condense one group of cited contexts into research notes,
+    keeping the [n] citation tags attached to the facts they support.
+    """
+    prompt = (
+        "You are a careful research analyst. Condense the cited excerpts below into dense research notes that keep "
+        "every fact, figure and argument relevant to the user's topic. Every statement must keep the citation "
+        "number(s) in square brackets from the excerpt it came from (e.g., [3]). Never invent, merge or renumber "
+        "citations. Return only the notes."
+    )
+    messages = [
+        {"role": "system", "content": "You condense research material without losing citations."},
+        {"role": "user", "content": f"User Topic: {user_query}\n\nCited Excerpts:\n" + "\n".join(texts) + f"\n\n{prompt}"}
+    ]
+    notes = await call_openrouter_async(
+        session, messages, max_tokens=SYNTHESIS_NOTES_MAX_TOKENS, purpose="synthesis"
+    )
+    if notes:
+        return notes.strip()
+    # Keep the raw material (trimmed) rather than losing the group's sources
+    return truncate_to_tokens("\n".join(texts), SYNTHESIS_NOTES_MAX_TOKENS)
+
+async def synthesize_report_context_async(session, user_query, cited_contexts):
+    """
+    Reduce the cited contexts to something that fits REPORT_CONTEXT_TOKEN_BUDGET.
+    Small runs are passed through unchanged; larger ones are grouped by source under a token budget,
+    summarized in parallel (map), and the notes are regrouped and summarized again until they fit (reduce).
+    """
+    texts = [(number, text) for number, text in cited_contexts]
+    level = 0
+    while sum(estimate_tokens(text) for _, text in texts) > REPORT_CONTEXT_TOKEN_BUDGET:
+        if level >= SYNTHESIS_MAX_LEVELS:
+            print("Synthesis level limit reached; truncating remaining notes.")
+            break
+        groups = group_by_token_budget(texts, SYNTHESIS_GROUP_TOKEN_BUDGET)
+        print(f"Synthesis level {level + 1}: summarizing {len(texts)} items in {len(groups)} groups.")
+        notes = await asyncio.gather(*[
+            summarize_context_group_async(session, user_query, group) for group in groups
+        ])
+        # Notes can cite several sources, so later levels no longer group by citation
+        texts = [(index, note) for index, note in enumerate(notes) if note]
+        level += 1
+    context_combined = "\n".join(text for _, text in texts)
+    return truncate_to_tokens(context_combined, REPORT_CONTEXT_TOKEN_BUDGET)
+
+async def prepare_report_messages_async(session, user_query, sourced_contexts):
+    """
+    Assign citations, synthesize the context down to the report budget and build the report prompt.
+    Returns (messages, reference_section).
+    """
+    references, cited_contexts, reference_section = assign_citations(sourced_contexts)
+    with tracing.span("synthesis", contexts=len(cited_contexts), sources=len(references)):
+        context_combined = await synthesize_report_context_async(session, user_query, cited_contexts)
+    return build_report_messages(user_query, context_combined), reference_section
+
+async def generate_final_report_async(session, user_query, sourced_contexts):
+    """
+    Construct the ultimate detailed report including proper citations and references.
+    """
+    messages, reference_section = await prepare_report_messages_async(session, user_query, sourced_contexts)
+    report = await call_openrouter_async(session, messages, purpose="report")
     if report:
         return report + reference_section
-    return "Error occurred while generating the report."
+    return REPORT_ERROR_MESSAGE
 
-async def process_link(session, link, user_query, search_query):
+async def generate_final_report_stream_async(session, user_query, sourced_contexts, metrics=None, tracer=None):
     """
-    Handle a single URL: fetch its content, assess its relevance, and if it qualifies, extract the associated context.
-    Returns a SourcedContext object upon success, or None otherwise.
+    Streaming variant of generate_final_report_async: yields the report text as it is generated,
+    followed by the reference section. Falls back to a regular request if streaming fails before any output;
+    if it fails part way, a visible note marks the report as incomplete.
+    metrics: Optional dict that receives "report_time_to_first_token" (seconds)
+    tracer: Optional tracing.Tracer that receives the synthesis and report spans
+    """
+    started = time.monotonic()
+    messages, reference_section = await tracing.run_traced(
+        tracer, prepare_report_messages_async(session, user_query, sourced_contexts)
+    )
+    report_span = tracer.start_span("report") if tracer else None
+    usage = {}
+    received = False
+    async for delta in stream_openrouter_async(session, messages, usage_out=usage):
+        if not received:
+            received = True
+            ttft = time.monotonic() - started
+            if metrics is not None:
+                metrics["report_time_to_first_token"] = ttft
+            print(f"Report time to first token: {ttft:.2f}s")
+        yield delta
+    if not received:
+        report = await tracing.run_traced(tracer, call_openrouter_async(session, messages, purpose="report"))
+        if not report:
+            if report_span:
+                tracer.end_span(report_span, "report generation failed")
+            yield REPORT_ERROR_MESSAGE
+            return
+        if metrics is not None:
+            metrics["report_time_to_first_token"] = time.monotonic() - started
+        yield report
+    error = None
+    if received and not usage.get("ok"):
+        error = "report stream interrupted"
+        print("Report stream broke off before the model finished; the report is incomplete.")
+        yield REPORT_TRUNCATED_MESSAGE
+    if report_span:
+        report_span.add(
+            llm_calls=1,
+            prompt_tokens=usage.get("prompt_tokens") or 0,
+            completion_tokens=usage.get("completion_tokens") or 0
+        )
+        tracer.end_span(report_span, error)
+    yield reference_section
+
+async def fetch_stage(session, job, deduplicator=None):
     """
-    print(f"Retrieving content from: {link}")
-    page_text = await fetch_webpage_text_async(session, link)
-    if not page_text:
+    Pipeline stage: download the page text for a job. Drops the job when nothing could be fetched,
+    or when the text nearly duplicates a page already seen in this run.
+    """
+    print(f"Retrieving content from: {job.link}")
+    with tracing.span("fetch", url=job.link):
+        job.page_text = await fetch_webpage_text_async(session, job.link)
+        tracing.add(bytes=len(job.page_text.encode("utf-8")) if job.page_text else 0)
+    if not job.page_text:
+        return None
+    if deduplicator is not None and deduplicator.is_near_duplicate(job.page_text):
+        print(f"Skipping near-duplicate content from: {job.link}")
+        job.page_text = None
+        job.duplicate = True
         return None
-    usefulness = await is_page_useful_async(session, user_query, page_text)
-    print(f"Relevance of {link}: {usefulness}")
+    job.chunks = chunking.split_into_chunks(job.page_text)
+    return job
+
+async def relevance_stage(session, user_query, job, batcher=None):
+    """
+    Pipeline stage: keep the job only if the LLM judges the page useful for the user's topic.
+    batcher: Optional RelevanceBatcher; when given, pages are judged in batched requests
+    """
+    async def judge():
+        if batcher is not None:
+            return await batcher.judge(job.page_text, job.chunks)
+        return await is_page_useful_async(session, user_query, job.page_text, job.chunks)
+
+    with tracing.span("relevance", url=job.link):
+        decision = prefilter.classify_page(job.page_text, user_query)
+        prefilter.STATS.record(decision)
+        if decision == prefilter.ASK_LLM:
+            usefulness = await judge()
+        else:
+            usefulness = "Yes" if decision == prefilter.ACCEPT else "No"
+            if prefilter.STATS.should_audit():
+                verdict = await judge()
+                prefilter.STATS.record_audit(decision, verdict)
+        tracing.set_attributes(prefilter=decision, verdict=usefulness)
+    print(f"Relevance of {job.link}: {usefulness}" + ("" if decision == prefilter.ASK_LLM else f" (prefilter {decision})"))
+    # Extraction only needs the page's chunks, so the full text can be released now
+    job.page_text = None
     if usefulness == "Yes":
-        context = await extract_relevant_context_async(session, user_query, search_query, page_text)
-        if context:
-            print(f"Context extracted from {link} (first 200 characters): {context[:200]}")
-            return SourcedContext(context, link)
+        return job
+    job.chunks = None
     return None
 
-# Modify research_flow function to accept search_limit parameter
-async def research_flow(user_query, iteration_limit, search_limit=5):
+async def extract_stage(session, user_query, job):
     """
-    Primary research procedure intended for integration with Streamlit.
-    search_limit: Maximum number of search results per query
+    Pipeline stage: extract the relevant context from the page and attach it to the job as a SourcedContext.
+    """
+    with tracing.span("extract", url=job.link):
+        context = await extract_relevant_context_async(
+            session, user_query, job.search_query, job.page_text, job.chunks
+        )
+    job.page_text = None
+    job.chunks = None
+    if context:
+        print(f"Context extracted from {job.link} (first 200 characters): {context[:200]}")
+        job.context = SourcedContext(context, job.link)
+        return job
+    return None
+
+async def process_link(session, link, user_query, search_query):
+    """
+    Handle a single URL: fetch its content, assess its relevance, and if it qualifies, extract the associated context.
+    Returns a SourcedContext object upon success, or None otherwise.
+    """
+    job = LinkJob(link, search_query)
+    job = await fetch_stage(session, job)
+    if job:
+        job = await relevance_stage(session, user_query, job)
+    if job:
+        job = await extract_stage(session, user_query, job)
+    return job.context if job else None
+
+async def feed_search_results(session, pipeline, queries, search_limit, iteration, progress, deduplicator, deadline,
+                              checkpoint=None, knowledge_base=None, on_stored=None):
     """
+    Run the searches for one round concurrently and submit each new link to the pipeline as soon as
+    the search that found it returns, instead of waiting for every search to finish.
+    Links whose canonical URL was already queued earlier in the run are skipped, and no new links are
+    submitted once the run deadline calls for wrapping up.
+    checkpoint: Optional checkpoint.Checkpoint; searches it already holds are not repeated
+    knowledge_base: Optional knowledge.KnowledgeBase; queries its freshness policy deems covered by earlier runs
+    are not searched, and the stored contexts covering them are passed to on_stored(contexts) instead
+    """
+    async def search(query):
+        if checkpoint is not None and query in checkpoint.searches:
+            return query, checkpoint.searches[query]
+        if knowledge_base is not None:
+            covering = knowledge_base.covering_contexts(query, before=deadline.started_at)
+            if covering:
+                print(f"Knowledge base already covers '{query}'; skipping the live search.")
+                if on_stored is not None:
+                    on_stored(covering)
+                return query, []
+        with tracing.span("search", query=query, iteration=iteration):
+            links = await deadlines.run_with_timeout(
+                perform_search_async(session, query, search_limit),
+                deadline.stage_timeout("search"), [], f"Search for '{query}'"
+            )
+            tracing.set_attributes(results=len(links))
+        if checkpoint is not None and links:
+            checkpoint.record("search", query=query, links=links)
+        return query, links
+
+    for next_result in asyncio.as_completed([search(query) for query in queries]):
+        query, links = await next_result
+        if deadline.should_wrap_up():
+            continue
+        for link in links:
+            if deduplicator.claim_url(link):
+                progress.submitted += 1
+                await pipeline.submit(LinkJob(link, query, iteration))
+            else:
+                progress.duplicate_urls += 1
+    progress.searches_done = True
+    print(f"Collected {progress.submitted} distinct links in this iteration "
+          f"({progress.duplicate_urls} already seen in this run were skipped).")
+
+def guarded_stage(stage, deadline, run_stage):
+    """
+    Wrap a pipeline stage so that it drops jobs once the deadline calls for wrapping up,
+    and gives up on a single job after the stage's timeout. Jobs dropped that way (or by an error)
+    are marked as interrupted so they are not checkpointed as done.
+    """
+    async def run_to_completion(job):
+        result = await run_stage(job)
+        job.interrupted = False
+        return result
+
+    async def run(job):
+        job.interrupted = True
+        if deadline.should_wrap_up():
+            return None
+        return await deadlines.run_with_timeout(
+            run_to_completion(job), deadline.stage_timeout(stage), None, f"{stage.capitalize()} of {job.link}"
+        )
+    return run
+
+async def collect_research_contexts(session, user_query, iteration_limit, search_limit, deadline=None, on_progress=None,
+                                    checkpoint=None):
+    """
+    Run the iterative search/extract loop and return the collected SourcedContext objects,
+    or None when the LLM produced no initial search queries.
+    Links stream through a fetch -> relevance -> extract pipeline as searches return; planning for the
+    next round starts once the round is done or has produced enough context, while stragglers keep running.
+    deadline: Optional deadlines.Deadline; when it nears, remaining links are skipped and the collected
+    contexts are returned so the report can still be written in time
+    on_progress: Optional callback on_progress(event, **data) receiving "iteration" and "link" progress events
+    checkpoint: Optional checkpoint.Checkpoint that logs completed searches, links and rounds; when it was
+    loaded from an interrupted run, the run continues from its last round without repeating finished work
+    """
+    if deadline is None:
+        deadline = deadlines.Deadline()
     sourced_contexts = []   
     all_search_queries = []  
     iteration = 0
+    rounds = {}
+    research_summary = ""
+    summarized_count = 0
+    novelty_tracker = novelty.NoveltyTracker()
+    links_processed = 0
+
+    def report_progress(event, **data):
+        if on_progress is not None:
+            on_progress(event, **data)
 
-    async with aiohttp.ClientSession() as session:
-        new_search_queries = await generate_search_queries_async(session, user_query)
+    def on_link_done(job, completed):
+        nonlocal links_processed
+        progress = rounds[job.iteration]
+        progress.finished += 1
+        links_processed += 1
+        if job.duplicate:
+            progress.duplicate_pages += 1
+        if completed and job.context:
+            progress.contexts += 1
+            sourced_contexts.append(job.context)
+        if checkpoint is not None and not job.interrupted:
+            checkpoint.record("link", link=job.link, context=job.context.text if completed and job.context else None)
+        if knowledge_base is not None and completed and job.context:
+            knowledge_base.add(job.context.text, job.link, job.search_query, user_query)
+        report_progress("link", links_processed=links_processed, contexts=len(sourced_contexts))
+
+    def add_stored(stored):
+        """
+        Add contexts from the knowledge base to the current round; returns how many were new to this run.
+        """
+        added = 0
+        for text, link in stored:
+            if deduplicator.claim_url(link):
+                sourced_contexts.append(SourcedContext(text, link))
+                added += 1
+        rounds[iteration].contexts += added
+        return added
+
+    deduplicator = dedup.RunDeduplicator()
+    knowledge_base = knowledge.get_knowledge_base()
+    if checkpoint is not None and checkpoint.resumed:
+        sourced_contexts.extend(SourcedContext(text, link) for text, link in checkpoint.contexts)
+        all_search_queries.extend(checkpoint.queries)
+        iteration = checkpoint.round["iteration"]
+        new_search_queries = checkpoint.round["queries"]
+        research_summary = checkpoint.round["summary"]
+        summarized_count = checkpoint.round["summarized"]
+        for link in checkpoint.links:
+            deduplicator.claim_url(link)
+        print(f"Resuming from checkpoint at iteration {iteration + 1} with {len(sourced_contexts)} contexts "
+              f"and {len(checkpoint.links)} finished links.")
+    else:
+        with tracing.span("plan", iteration=0):
+            new_search_queries = await deadlines.run_with_timeout(
+                generate_search_queries_async(session, user_query),
+                deadline.stage_timeout("planning"), [], "Search query generation"
+            )
         if not new_search_queries:
-            return "No search queries were generated by the LLM. Terminating process."
+            return None
         all_search_queries.extend(new_search_queries)
+        if checkpoint is not None:
+            checkpoint.record("run", user_query=user_query, iteration_limit=iteration_limit, search_limit=search_limit)
+            checkpoint.record("round", iteration=0, queries=new_search_queries, summary="", summarized=0)
+            checkpoint.flush(sync=True)
 
+    batcher = RelevanceBatcher(session, user_query) if RELEVANCE_BATCHING_ENABLED else None
+    pipeline = Pipeline(
+        [
+            ("fetch", guarded_stage("fetch", deadline,
+                                    lambda job: fetch_stage(session, job, deduplicator)), FETCH_WORKERS),
+            ("relevance", guarded_stage("relevance", deadline,
+                                        lambda job: relevance_stage(session, user_query, job, batcher)), RELEVANCE_WORKERS),
+            ("extract", guarded_stage("extract", deadline,
+                                      lambda job: extract_stage(session, user_query, job)), EXTRACT_WORKERS),
+        ],
+        PIPELINE_QUEUE_SIZE,
+        on_done=on_link_done
+    )
+    pipeline.start()
+    try:
         while iteration < iteration_limit:
             print(f"\n--- Iteration {iteration + 1} ---")
-            iteration_contexts = []
-
-            # Update to include search_limit
-            search_tasks = [perform_search_async(session, query, search_limit) for query in new_search_queries]
-            search_results = await asyncio.gather(*search_tasks)
+            report_progress("iteration", iteration=iteration + 1)
+            progress = RoundProgress()
+            rounds[iteration] = progress
 
+            if knowledge_base is not None:
+                with tracing.span("knowledge", iteration=iteration):
+                    stored = knowledge_base.retrieve(
+                        [user_query] + new_search_queries,
+                        exclude_urls={ctx.source_url for ctx in sourced_contexts}
+                    )
+                    tracing.set_attributes(retrieved=add_stored(stored))
+                print(f"Reused {progress.contexts} contexts from the knowledge base.")
 
-            unique_links = {}
-            for idx, links in enumerate(search_results):
-                query = new_search_queries[idx]
-                for link in links:
-                    if link not in unique_links:
-                        unique_links[link] = query
+            await feed_search_results(
+                session, pipeline, new_search_queries, search_limit, iteration, progress, deduplicator, deadline,
+                checkpoint, knowledge_base, add_stored
+            )
+            try:
+                await asyncio.wait_for(
+                    pipeline.wait_for(progress.ready_for_planning), deadline.research_time_left()
+                )
+            except asyncio.TimeoutError:
+                pass
+            if deadline.should_wrap_up():
+                print("Run deadline is near; skipping remaining links and moving on to the report.")
+                break
+            if progress.finished < progress.submitted:
+                print(f"Planning next round with {progress.submitted - progress.finished} links still in flight.")
 
-            print(f"Collected {len(unique_links)} distinct links in this iteration.")
+            if not progress.contexts:
+                print("No relevant information was found in this iteration.")
+            print(f"Iteration {iteration + 1} skipped {progress.duplicate_urls} repeated URLs and "
+                  f"{progress.duplicate_pages} near-duplicate pages so far.")
 
-            link_tasks = [
-                process_link(session, link, user_query, unique_links[link])
-                for link in unique_links
-            ]
-            link_results = await asyncio.gather(*link_tasks)
+            # Only contexts that arrived since the last round are folded into the summary
+            new_contexts = sourced_contexts[summarized_count:]
+            summarized_count = len(sourced_contexts)
 
-            for res in link_results:
-                if res:
-                    iteration_contexts.append(res)
+            marginal_novelty = novelty_tracker.measure([ctx.text for ctx in new_contexts])
+            print(f"Iteration {iteration + 1} marginal novelty: {marginal_novelty:.2f}")
+            if novelty_tracker.should_stop():
+                print(f"Novelty stayed below {novelty_tracker.threshold} for {novelty_tracker.patience} "
+                      "iterations; concluding the research loop.")
+                break
 
-            if iteration_contexts:
-                sourced_contexts.extend(iteration_contexts)
-            else:
-                print("No relevant information was found in this iteration.")
+            with tracing.span("plan", iteration=iteration + 1, novelty=marginal_novelty):
+                research_summary = await deadlines.run_with_timeout(
+                    update_research_summary_async(
+                        session, user_query, research_summary, [ctx.text for ctx in new_contexts]
+                    ),
+                    deadline.stage_timeout("summary"), research_summary, "Research summary update"
+                )
+                new_search_queries = await deadlines.run_with_timeout(
+                    get_new_search_queries_async(session, user_query, all_search_queries, [research_summary]),
+                    deadline.stage_timeout("planning"), [], "Research planning"
+                )
 
-            context_texts = [ctx.text for ctx in sourced_contexts]
-            new_search_queries = await get_new_search_queries_async(
-                session, user_query, all_search_queries, context_texts
-            )
-            
             if new_search_queries == "":
                 print("LLM has determined that additional research is unnecessary.")
                 break
             elif new_search_queries:
                 print("LLM provided extra search queries:", new_search_queries)
                 all_search_queries.extend(new_search_queries)
+                if checkpoint is not None:
+                    checkpoint.record("round", iteration=iteration + 1, queries=new_search_queries,
+                                      summary=research_summary, summarized=summarized_count)
+                    checkpoint.flush(sync=True)
             else:
                 print("LLM returned no further search queries. Concluding the loop.")
                 break
 
             iteration += 1
 
-        final_report = await generate_final_report_async(session, user_query, sourced_contexts)
-        return final_report
+        # Let stragglers from the last rounds finish before writing the report, unless time is up
+        if not deadline.should_wrap_up():
+            try:
+                await asyncio.wait_for(pipeline.join(), deadline.research_time_left())
+            except asyncio.TimeoutError:
+                print(f"Run deadline reached with {pipeline.pending} links unfinished; writing the report now.")
+    finally:
+        await pipeline.close()
+        if batcher is not None:
+            await batcher.close()
+        if checkpoint is not None:
+            checkpoint.close()
+
+    page_cache = cache.get_page_cache()
+    if page_cache is not None:
+        print("Page cache stats:", page_cache.stats())
+    print("Provider scheduler stats:", scheduler.limiter_stats())
+    print("Connection pool stats:", http_client.pool_stats())
+    print("Relevance prefilter stats:", prefilter.STATS.stats())
+    print("Model usage stats:", routing.STATS.stats())
+    print("Jina fetch latency stats:", FETCH_LATENCY.stats())
+    print("Fetch backend stats:", fetchers.STATS.stats())
+    if knowledge_base is not None:
+        print("Knowledge base stats:", knowledge_base.stats())
+    if batcher is not None:
+        print(f"Relevance batches sent: {batcher.batches_sent}, single-page fallbacks: {batcher.fallbacks}")
+
+    return sourced_contexts
+
+@contextlib.asynccontextmanager
+async def open_session(session=None, keep_pool=False):
+    """
+    Async context manager yielding `session` unchanged, or else the process-wide pooled client.
+    Provider hosts are (re)registered so a patched URL routes correctly.
+    The current loop's pooled sessions are closed when the last run using them on the loop exits, so
+    asyncio.run(research_flow(...)) leaks nothing while concurrent runs on one loop keep their connections.
+    keep_pool: Keep the pool's warm connections even then, for callers on a long-lived loop that call
+    http_client.close_client() themselves
+    """
+    if session is not None:
+        yield session
+        return
+    client = http_client.get_client()
+    client.register("openrouter", OPENROUTER_URL)
+    client.register("serpapi", SERPAPI_URL)
+    client.register("jina", JINA_BASE_URL)
+    client.start_run()
+    try:
+        yield client
+    finally:
+        await client.end_run(keep_pool)
+
+def open_checkpoint(checkpoint_path, user_query, iteration_limit, search_limit):
+    """
+    Open a run's checkpoint log, or return None without a path. The log of a finished run is started over;
+    the log of an unfinished run with a different query or limits raises ValueError instead of being resumed.
+    """
+    if not checkpoint_path:
+        return None
+    checkpoint = checkpoints.Checkpoint(checkpoint_path)
+    if checkpoint.done:
+        print(f"Checkpoint {checkpoint_path} holds a finished run; starting a new log.")
+        checkpoint.reset()
+    elif not checkpoint.matches(user_query, iteration_limit, search_limit):
+        run = checkpoint.run
+        raise ValueError(
+            f"Checkpoint {checkpoint_path} belongs to an unfinished run of '{run['user_query']}' "
+            f"(iteration_limit={run['iteration_limit']}, search_limit={run['search_limit']}); "
+            "resume it with resume_research_flow or use another path"
+        )
+    return checkpoint
+
+# Modify research_flow function to accept search_limit parameter
+async def research_flow(user_query, iteration_limit, search_limit=5, deadline_seconds=None, tracer=None, session=None,
+                        on_progress=None, checkpoint_path=None, keep_pool=False):
+    """
+    Primary research procedure intended for integration with Streamlit.
+    search_limit: Maximum number of search results per query
+    deadline_seconds: Optional wall-clock budget for the whole run, report included
+    tracer: Optional tracing.Tracer that receives per-stage spans (timings, bytes, tokens, cache hits, retries)
+    session: Optional aiohttp.ClientSession; defaults to the process-wide pooled client (research/http_client.py)
+    on_progress: Optional callback on_progress(event, **data) for "iteration", "link" and "report" events
+    checkpoint_path: Optional JSONL checkpoint log; an existing log for an interrupted run of the same query and
+    limits is resumed (see open_checkpoint)
+    keep_pool: Leave the pooled HTTP sessions open after the run even when no other run on the loop
+    is using them (see open_session)
+    """
+    deadline = deadlines.Deadline(deadline_seconds)
+    if tracer is None:
+        tracer = tracing.Tracer()
+    checkpoint = open_checkpoint(checkpoint_path, user_query, iteration_limit, search_limit)
+    with tracing.use_tracer(tracer):
+        async with open_session(session, keep_pool) as session:
+            sourced_contexts = await collect_research_contexts(
+                session, user_query, iteration_limit, search_limit, deadline, on_progress, checkpoint
+            )
+            if sourced_contexts is None:
+                return NO_QUERIES_MESSAGE
+            if on_progress is not None:
+                on_progress("report", contexts=len(sourced_contexts))
+            with tracing.span("report"):
+                final_report = await deadlines.run_with_timeout(
+                    generate_final_report_async(session, user_query, sourced_contexts),
+                    deadline.stage_timeout("report"), REPORT_ERROR_MESSAGE, "Report generation"
+                )
+    if checkpoint is not None and final_report != REPORT_ERROR_MESSAGE:
+        checkpoint.finish()
+    tracing.export(tracer)
+    return final_report
+
+async def research_flow_stream(user_query, iteration_limit, search_limit=5, metrics=None, deadline_seconds=None, tracer=None,
+                               session=None, on_progress=None, checkpoint_path=None, keep_pool=False):
+    """
+    Streaming counterpart of research_flow: runs the research, then yields the final report in chunks
+    as the model generates it.
+    metrics: Optional dict that receives timing metrics such as "report_time_to_first_token"
+    deadline_seconds: Optional wall-clock budget for the whole run; synthesis and report streaming are cut off
+    (with a note that the report is incomplete) once it runs out
+    tracer: Optional tracing.Tracer that receives per-stage spans
+    session: Optional aiohttp.ClientSession; defaults to the process-wide pooled client
+    on_progress: Optional callback on_progress(event, **data) for "iteration", "link" and "report" events
+    checkpoint_path: Optional JSONL checkpoint log; an existing log for an interrupted run of the same query and
+    limits is resumed (see open_checkpoint)
+    keep_pool: Leave the pooled HTTP sessions open after the run even when no other run on the loop
+    is using them (see open_session)
+    """
+    deadline = deadlines.Deadline(deadline_seconds)
+    if tracer is None:
+        tracer = tracing.Tracer()
+    checkpoint = open_checkpoint(checkpoint_path, user_query, iteration_limit, search_limit)
+    async with open_session(session, keep_pool) as session:
+        sourced_contexts = await tracing.run_traced(tracer, collect_research_contexts(
+            session, user_query, iteration_limit, search_limit, deadline, on_progress, checkpoint
+        ))
+        if sourced_contexts is None:
+            yield NO_QUERIES_MESSAGE
+            return
+        if on_progress is not None:
+            on_progress("report", contexts=len(sourced_contexts))
+        report_failed = False
+        async for chunk in deadlines.stream_with_timeout(
+            generate_final_report_stream_async(session, user_query, sourced_contexts, metrics, tracer),
+            deadline.stage_timeout("report"), REPORT_TRUNCATED_MESSAGE, "Report generation"
+        ):
+            report_failed = report_failed or chunk in (REPORT_ERROR_MESSAGE, REPORT_TRUNCATED_MESSAGE)
+            yield chunk
+    if checkpoint is not None and not report_failed:
+        checkpoint.finish()
+    tracing.export(tracer)
+
+async def resume_research_flow(checkpoint_path, deadline_seconds=None, tracer=None, session=None, keep_pool=False):
+    """
+    Continue an interrupted research_flow run from its checkpoint log, with the run's original query and limits.
+    Finished searches, links and extractions are reused; pages fetched but not yet judged are usually
+    served from the page cache.
+    """
+    checkpoint = checkpoints.Checkpoint(checkpoint_path)
+    run = checkpoint.run
+    if run is None:
+        raise ValueError(f"No research run recorded in checkpoint {checkpoint_path}")
+    if checkpoint.done:
+        raise ValueError(f"The run in checkpoint {checkpoint_path} already finished; there is nothing to resume")
+    return await research_flow(
+        run["user_query"], run["iteration_limit"], run["search_limit"], deadline_seconds, tracer, session,
+        checkpoint_path=checkpoint_path, keep_pool=keep_pool
+    )
 
 def main():
     """
@@ -354,9 +1478,16 @@ def main():
     iter_limit_input = input("Enter the maximum number of iterations (default is 10): ").strip()
     iteration_limit = int(iter_limit_input) if iter_limit_input.isdigit() else 10
     
-    final_report = asyncio.run(research_flow(user_query, iteration_limit))
-    print("\n==== FINAL REPORT ====\n")
-    print(final_report)
+    async def print_report():
+        header_printed = False
+        async for chunk in research_flow_stream(user_query, iteration_limit):
+            if not header_printed:
+                print("\n==== FINAL REPORT ====\n")
+                header_printed = True
+            print(chunk, end="", flush=True)
+        print()
+
+    asyncio.run(print_report())
 
 if __name__ == "__main__":
     main()
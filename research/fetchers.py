@@ -0,0 +1,201 @@
+import codecs
+import re
+import threading
+from html.parser import HTMLParser
+from urllib.parse import urlsplit
+
+# Fetch backend routing. "jina" renders pages through the Jina reader; "local" downloads the page
+# directly and converts the HTML to text in-process. A failed local extraction falls back to Jina.
+DEFAULT_BACKEND = "jina"
+FALLBACK_BACKEND = "jina"
+# Domain -> backend; a domain also matches its subdomains, e.g. {"wikipedia.org": "local", "arxiv.org": "jina"}
+DOMAIN_BACKENDS = {}
+
+# A local extraction with less text than this is treated as a failure (JavaScript-rendered pages, paywalls)
+LOCAL_MIN_TEXT_CHARS = 500
+LOCAL_CONTENT_TYPES = ("text/html", "application/xhtml+xml", "text/plain")
+LOCAL_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (compatible; OpenDeepResearch/1.0)",
+    "Accept": "text/html,application/xhtml+xml,text/plain;q=0.9,*/*;q=0.1",
+}
+
+# Elements whose content is never article text
+SKIP_TAGS = {
+    "script", "style", "noscript", "template", "svg", "iframe", "canvas", "nav", "footer", "header",
+    "aside", "form", "button", "select", "textarea", "head",
+}
+# Elements with one of these words in their class or id are page chrome. Whole words only (class/id split on
+# whitespace, "-" and "_"), so e.g. "entry-content shareable" is kept while "share-buttons" is skipped.
+BOILERPLATE_TOKENS = {
+    "cookie", "cookies", "consent", "banner", "sidebar", "menu", "navbar", "breadcrumb", "breadcrumbs", "footer",
+    "comment", "comments", "share", "sharing", "social", "subscribe", "newsletter", "advert", "advertisement",
+    "promo", "popup", "related",
+}
+CLASS_TOKEN_SEPARATORS = re.compile(r"[\s_-]+")
+BLOCK_TAGS = {
+    "p", "div", "section", "article", "main", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6",
+    "blockquote", "pre", "table", "tr", "td", "th", "dd", "dt", "figcaption", "br", "hr",
+}
+VOID_TAGS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+MAX_LINK_DENSITY = 0.6       # short blocks that are mostly link text (menus, tag lists) are dropped
+LINK_DENSITY_MAX_CHARS = 300
+
+class HtmlTextExtractor(HTMLParser):
+    """
+    Streaming HTML-to-markdown converter: feed() it decoded chunks as they arrive. Scripts, navigation,
+    footers and elements whose class/id looks like page chrome are skipped, as are short link-heavy blocks.
+    Headings become "#" lines and list items "- " lines; `chars` counts the text collected so far.
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.title = ""
+        self.blocks = []
+        self.chars = 0
+        self._stack = []
+        self._skip_depth = 0
+        self._in_title = False
+        self._parts = []
+        self._link_chars = 0
+        self._link_depth = 0
+        self._prefix = ""
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "title" and not self.title:
+            self._in_title = True
+        if tag in BLOCK_TAGS:
+            self._flush()
+            if tag in ("h1", "h2", "h3", "h4", "h5", "h6"):
+                self._prefix = "#" * int(tag[1]) + " "
+            elif tag == "li":
+                self._prefix = "- "
+        if tag in VOID_TAGS:
+            return
+        attributes = dict(attrs)
+        marker = f"{attributes.get('class') or ''} {attributes.get('id') or ''}".lower()
+        skip = tag in SKIP_TAGS or (tag not in ("html", "body", "main", "article")
+                                    and not BOILERPLATE_TOKENS.isdisjoint(CLASS_TOKEN_SEPARATORS.split(marker)))
+        self._stack.append((tag, bool(skip)))
+        if skip:
+            if not self._skip_depth:
+                self._flush()
+            self._skip_depth += 1
+        if tag == "a":
+            self._link_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            self._in_title = False
+        if tag in VOID_TAGS or not any(open_tag == tag for open_tag, _ in self._stack):
+            return
+        # Close any elements left open inside this one
+        while self._stack:
+            open_tag, skip = self._stack.pop()
+            if skip:
+                self._skip_depth -= 1
+            if open_tag == "a":
+                self._link_depth -= 1
+            if open_tag == tag:
+                break
+        if tag in BLOCK_TAGS:
+            self._flush()
+            self._prefix = ""
+
+    def handle_data(self, data):
+        if self._in_title:
+            self.title += data
+            return
+        if self._skip_depth:
+            return
+        self._parts.append(data)
+        if self._link_depth:
+            self._link_chars += len(data.strip())
+
+    def _flush(self):
+        text = " ".join("".join(self._parts).split())
+        link_chars = self._link_chars
+        self._parts = []
+        self._link_chars = 0
+        if len(text) < 3:
+            return
+        prefix = self._prefix
+        self._prefix = ""
+        if len(text) < LINK_DENSITY_MAX_CHARS and link_chars / len(text) > MAX_LINK_DENSITY:
+            return
+        self.blocks.append(prefix + text)
+        self.chars += len(text) + 2
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def text(self):
+        body = "\n\n".join(self.blocks)
+        title = " ".join(self.title.split())
+        return f"Title: {title}\n\n{body}" if title else body
+
+async def read_html_text(resp, max_bytes, max_chars, chunk_bytes=65536):
+    """
+    Stream an HTML (or plain text) response through HtmlTextExtractor, stopping at max_bytes read or
+    max_chars of extracted text. Returns "" for other content types (e.g. PDFs), which Jina handles better.
+    """
+    if resp.content_type not in LOCAL_CONTENT_TYPES:
+        print(f"Local fetch of {resp.url} returned {resp.content_type}; not extracting locally")
+        return ""
+    decoder = codecs.getincrementaldecoder(resp.charset or "utf-8")(errors="replace")
+    plain_text = resp.content_type == "text/plain"
+    extractor = None if plain_text else HtmlTextExtractor()
+    parts = []
+    chars = 0
+    bytes_read = 0
+    async for block in resp.content.iter_chunked(chunk_bytes):
+        bytes_read += len(block)
+        text = decoder.decode(block)
+        if plain_text:
+            parts.append(text)
+            chars += len(text)
+        else:
+            extractor.feed(text)
+            chars = extractor.chars
+        if bytes_read >= max_bytes or chars >= max_chars:
+            break
+    if plain_text:
+        return "".join(parts)[:max_chars]
+    extractor.close()
+    return extractor.text()[:max_chars]
+
+def backend_for(url):
+    """
+    Name of the fetch backend for url: the DOMAIN_BACKENDS entry for its host or a parent domain, else DEFAULT_BACKEND.
+    """
+    host = (urlsplit(url).hostname or "").lower()
+    while host:
+        backend = DOMAIN_BACKENDS.get(host)
+        if backend is not None:
+            return backend
+        host = host.partition(".")[2]
+    return DEFAULT_BACKEND
+
+class FetchStats:
+    """
+    Pages fetched per backend, local extraction failures and fallbacks to Jina.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fetched = {}
+        self.failures = {}
+        self.fallbacks = 0
+
+    def record(self, backend, ok):
+        with self._lock:
+            counter = self.fetched if ok else self.failures
+            counter[backend] = counter.get(backend, 0) + 1
+
+    def record_fallback(self):
+        with self._lock:
+            self.fallbacks += 1
+
+    def stats(self):
+        with self._lock:
+            return {"fetched": dict(self.fetched), "failures": dict(self.failures), "fallbacks": self.fallbacks}
+
+STATS = FetchStats()
@@ -0,0 +1,222 @@
+import asyncio
+import threading
+from urllib.parse import urlsplit
+
+import aiohttp
+
+# Connection pool per provider; "default" serves any other host (e.g. direct page fetches)
+# limit_per_host: open connections to one host; keepalive: seconds an idle connection is kept for reuse;
+# dns_ttl: seconds a DNS answer is cached
+POOL_SETTINGS = {
+    "openrouter": {"limit": 32, "limit_per_host": 16, "keepalive": 60, "dns_ttl": 600},
+    "serpapi": {"limit": 16, "limit_per_host": 8, "keepalive": 30, "dns_ttl": 600},
+    "jina": {"limit": 32, "limit_per_host": 20, "keepalive": 30, "dns_ttl": 600},
+    "default": {"limit": 64, "limit_per_host": 4, "keepalive": 15, "dns_ttl": 300},
+}
+
+# HTTP client timeouts (seconds) for pooled sessions. There is deliberately no `total`: it would also cover
+# reading the body and cut long report generations short; deadlines.STAGE_TIMEOUTS bound whole calls instead.
+HTTP_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=90)
+# Non-streamed report and synthesis completions send nothing until the whole answer is generated,
+# so their read timeout matches deadlines.STAGE_TIMEOUTS["report"]
+GENERATION_TIMEOUT = aiohttp.ClientTimeout(total=None, sock_connect=15, sock_read=600)
+
+class PoolStats:
+    """
+    Connection reuse counters for one provider pool, fed by aiohttp tracing hooks.
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.new_connections = 0
+        self.reused_connections = 0
+        self.dns_cache_hits = 0
+        self.dns_cache_misses = 0
+        self.peak_in_use = 0
+
+    def trace_config(self, connector):
+        config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, context, params):
+            self.requests += 1
+            self.peak_in_use = max(self.peak_in_use, connections_in_use(connector) + 1)
+
+        async def on_connection_create_end(session, context, params):
+            self.new_connections += 1
+
+        async def on_connection_reuseconn(session, context, params):
+            self.reused_connections += 1
+
+        async def on_dns_cache_hit(session, context, params):
+            self.dns_cache_hits += 1
+
+        async def on_dns_cache_miss(session, context, params):
+            self.dns_cache_misses += 1
+
+        config.on_request_start.append(on_request_start)
+        config.on_connection_create_end.append(on_connection_create_end)
+        config.on_connection_reuseconn.append(on_connection_reuseconn)
+        config.on_dns_cache_hit.append(on_dns_cache_hit)
+        config.on_dns_cache_miss.append(on_dns_cache_miss)
+        return config
+
+def connections_in_use(connector):
+    return len(getattr(connector, "_acquired", ()))
+
+def idle_connections(connector):
+    return sum(len(connections) for connections in getattr(connector, "_conns", {}).values())
+
+class PooledClient:
+    """
+    Drop-in stand-in for an aiohttp.ClientSession that sends each request through the session of the
+    provider its URL belongs to, so every provider keeps its own warm, separately limited connection pool.
+    Sessions are bound to an event loop, so each loop that uses the client gets its own set; sets belonging
+    to loops that have since closed are dropped.
+    """
+    def __init__(self):
+        self.hosts = {}
+        self.stats = {name: PoolStats() for name in POOL_SETTINGS}
+        self._sessions = {}
+        self._active_runs = {}
+        self._lock = threading.Lock()
+
+    def register(self, provider, url):
+        """
+        Route requests for url's host to the provider's pool.
+        """
+        self.hosts[urlsplit(url).netloc] = provider
+
+    def provider_for(self, url):
+        return self.hosts.get(urlsplit(str(url)).netloc, "default")
+
+    def session(self, provider):
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._sessions:
+                self._sessions = {key: value for key, value in self._sessions.items() if not key.is_closed()}
+                self._sessions[loop] = {}
+            sessions = self._sessions[loop]
+            session = sessions.get(provider)
+            if session is None or session.closed:
+                settings = POOL_SETTINGS.get(provider, POOL_SETTINGS["default"])
+                connector = aiohttp.TCPConnector(
+                    limit=settings["limit"],
+                    limit_per_host=settings["limit_per_host"],
+                    keepalive_timeout=settings["keepalive"],
+                    ttl_dns_cache=settings["dns_ttl"],
+                    use_dns_cache=True,
+                )
+                stats = self.stats.setdefault(provider, PoolStats())
+                session = aiohttp.ClientSession(
+                    connector=connector, timeout=HTTP_TIMEOUT, trace_configs=[stats.trace_config(connector)]
+                )
+                sessions[provider] = session
+            return session
+
+    def request(self, method, url, **kwargs):
+        return self.session(self.provider_for(url)).request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.session(self.provider_for(url)).get(url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.session(self.provider_for(url)).post(url, **kwargs)
+
+    def start_run(self):
+        """
+        Count a run using the pool on the current loop; pair with end_run().
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._active_runs[loop] = self._active_runs.get(loop, 0) + 1
+
+    async def end_run(self, keep_pool=False):
+        """
+        End a run started with start_run(). The current loop's sessions are closed once no other run on the loop
+        is using them, unless keep_pool is set (the caller then closes the pool itself).
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            active = self._active_runs.get(loop, 1) - 1
+            if active > 0:
+                self._active_runs[loop] = active
+                return
+            self._active_runs.pop(loop, None)
+        if not keep_pool:
+            await self.close()
+
+    async def close(self):
+        """
+        Close the pooled sessions of the current loop. Call before the loop that used the pool ends.
+        """
+        with self._lock:
+            sessions = list(self._sessions.pop(asyncio.get_running_loop(), {}).values())
+        for session in sessions:
+            await session.close()
+
+    def pool_stats(self):
+        """
+        Per-provider pool utilization: requests, new vs. reused connections, DNS cache hits and connection counts.
+        """
+        with self._lock:
+            connectors = {}
+            for sessions in self._sessions.values():
+                for provider, session in sessions.items():
+                    if not session.closed:
+                        connectors.setdefault(provider, []).append(session.connector)
+        stats = {}
+        for provider, counters in self.stats.items():
+            settings = POOL_SETTINGS.get(provider, POOL_SETTINGS["default"])
+            stats[provider] = {
+                "requests": counters.requests,
+                "new_connections": counters.new_connections,
+                "reused_connections": counters.reused_connections,
+                "reuse_rate": (counters.reused_connections / (counters.new_connections + counters.reused_connections)
+                               if counters.new_connections + counters.reused_connections else 0.0),
+                "dns_cache_hits": counters.dns_cache_hits,
+                "dns_cache_misses": counters.dns_cache_misses,
+                "in_use": sum(connections_in_use(connector) for connector in connectors.get(provider, [])),
+                "idle": sum(idle_connections(connector) for connector in connectors.get(provider, [])),
+                "peak_in_use": counters.peak_in_use,
+                "limit": settings["limit"],
+            }
+        return stats
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_client():
+    """
+    Return the process-wide pooled client.
+    """
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = PooledClient()
+        return _client
+
+async def close_client():
+    """
+    Lifecycle hook: close the pooled sessions, e.g. when an event loop that used them is about to end.
+    """
+    with _client_lock:
+        client = _client
+    if client is not None:
+        await client.close()
+
+def pool_stats():
+    with _client_lock:
+        client = _client
+    return client.pool_stats() if client is not None else {}
+
+def reset_pool_stats():
+    """
+    Zero the per-provider pool counters (e.g. between benchmark scenarios); open connections are kept.
+    """
+    with _client_lock:
+        client = _client
+    if client is not None:
+        for counters in client.stats.values():
+            counters.reset()
@@ -0,0 +1,169 @@
+import asyncio
+import contextlib
+import threading
+import time
+import uuid
+from collections import deque
+
+from research import deep_research
+from research import http_client
+from research import tracing
+
+# Job manager settings
+JOB_MAX_CONCURRENT = 4          # research jobs running at once across all users; later jobs queue
+JOB_RETENTION_SECONDS = 3600    # finished jobs are forgotten after this long
+JOB_MAX_EVENTS = 1000           # progress events kept per job
+
+FINISHED_STATUSES = ("done", "failed", "cancelled")
+
+class ResearchJob:
+    """
+    One research request and everything the UI needs to show about it: status, latest progress,
+    the progress event log and the report text streamed so far.
+    Written from the job manager's event loop thread and read from the Streamlit script thread.
+    """
+    def __init__(self, user_query, iteration_limit, search_limit=5, deadline_seconds=None):
+        self.id = uuid.uuid4().hex
+        self.user_query = user_query
+        self.iteration_limit = iteration_limit
+        self.search_limit = search_limit
+        self.deadline_seconds = deadline_seconds
+        self.status = "queued"
+        self.error = None
+        self.created = time.time()
+        self.finished = None
+        self.progress = {"iteration": 0, "links_processed": 0, "contexts": 0}
+        self.metrics = {}
+        self.tracer = tracing.Tracer()
+        self._events = deque(maxlen=JOB_MAX_EVENTS)
+        self._next_seq = 0
+        self._report_chunks = []
+        self._lock = threading.Lock()
+        self._future = None
+
+    @property
+    def done(self):
+        return self.status in FINISHED_STATUSES
+
+    def publish(self, event, **data):
+        """
+        Record a progress event; used as the on_progress callback of research_flow_stream.
+        """
+        with self._lock:
+            self._events.append(dict(data, seq=self._next_seq, type=event, time=time.time()))
+            self._next_seq += 1
+            self.progress.update(data)
+            self.progress["stage"] = event
+
+    def events_since(self, seq=0):
+        """
+        Progress events with a sequence number >= seq, and the sequence number to pass next time.
+        """
+        with self._lock:
+            return [event for event in self._events if event["seq"] >= seq], self._next_seq
+
+    def append_report(self, chunk):
+        with self._lock:
+            self._report_chunks.append(chunk)
+
+    @property
+    def report(self):
+        with self._lock:
+            return "".join(self._report_chunks)
+
+    def finish(self, status, error=None):
+        self.status = status
+        self.error = error
+        self.finished = time.time()
+        self.publish(status, error=error)
+
+class JobManager:
+    """
+    Runs research jobs on a long-lived event loop in a background thread. Jobs outlive the Streamlit
+    script run that submitted them, and every session shares one worker pool and the pooled HTTP client.
+    """
+    def __init__(self, max_concurrent_jobs=JOB_MAX_CONCURRENT):
+        self.max_concurrent_jobs = max_concurrent_jobs
+        self.jobs = {}
+        self._lock = threading.Lock()
+        self._semaphore = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run_loop, name="research-jobs", daemon=True)
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(self, user_query, iteration_limit, search_limit=5, deadline_seconds=None, api_keys=None):
+        """
+        Queue a research job and return it immediately.
+        api_keys: Optional dict with "openrouter", "serpapi" and "jina" keys used for this job's requests only
+        """
+        job = ResearchJob(user_query, iteration_limit, search_limit, deadline_seconds)
+        with self._lock:
+            self._prune()
+            self.jobs[job.id] = job
+        job.publish("queued")
+        job._future = asyncio.run_coroutine_threadsafe(self._run(job, api_keys), self._loop)
+        # A job cancelled before it started never reaches _run's handlers
+        job._future.add_done_callback(lambda future: None if job.done else job.finish("cancelled"))
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None and job._future is not None:
+            job._future.cancel()
+
+    def stats(self):
+        with self._lock:
+            jobs = list(self.jobs.values())
+        counts = {}
+        for job in jobs:
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return counts
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [job_id for job_id, job in self.jobs.items() if job.done and job.finished < cutoff]:
+            del self.jobs[job_id]
+
+    async def _run(self, job, api_keys):
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrent_jobs)
+        try:
+            async with self._semaphore:
+                job.status = "running"
+                job.publish("started")
+                # Keys are scoped to this job's task; other jobs on the loop keep their own
+                with deep_research.use_api_keys(api_keys) if api_keys else contextlib.nullcontext():
+                    async for chunk in deep_research.research_flow_stream(
+                        job.user_query, job.iteration_limit, job.search_limit, job.metrics,
+                        job.deadline_seconds, job.tracer, on_progress=job.publish, keep_pool=True
+                    ):
+                        job.append_report(chunk)
+            job.finish("done")
+        except asyncio.CancelledError:
+            job.finish("cancelled")
+            raise
+        except Exception as e:
+            print(f"Research job {job.id} failed:", e)
+            job.finish("failed", str(e))
+
+    def shutdown(self):
+        """
+        Cancel running jobs, close the pooled HTTP sessions and stop the background loop.
+        """
+        with self._lock:
+            jobs = list(self.jobs.values())
+        for job in jobs:
+            if job._future is not None:
+                job._future.cancel()
+
+        asyncio.run_coroutine_threadsafe(http_client.close_client(), self._loop).result(timeout=10)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=10)
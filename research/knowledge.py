@@ -0,0 +1,172 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from research import cache
+from research.chunking import tokenize
+
+# Cross-run knowledge base of extracted contexts (opt-in). Stored next to the page cache in cache.CACHE_DIR.
+KNOWLEDGE_BASE_ENABLED = False
+KNOWLEDGE_TOP_K = 8                          # stored contexts fed into each research round
+KNOWLEDGE_MIN_COVERAGE = 0.6                 # a stored context must contain this fraction of one query's terms
+KNOWLEDGE_CANDIDATES = 50                    # best BM25 matches checked against KNOWLEDGE_MIN_COVERAGE
+
+# Freshness policy: only contexts younger than KNOWLEDGE_FRESH_SECONDS are retrieved (older pages are fetched
+# again), and a search query is answered from the knowledge base instead of a live search only when at least
+# KNOWLEDGE_MIN_MATCHES fresh stored contexts contain all its terms.
+# Queries that ask for recent information always go to a live search.
+KNOWLEDGE_FRESH_SECONDS = 14 * 24 * 60 * 60
+KNOWLEDGE_MIN_MATCHES = 3
+TIME_SENSITIVE_PATTERN = re.compile(
+    r"\b(latest|recent|recently|today|yesterday|current|currently|now|news|this (week|month|year)|20\d\d)\b",
+    re.IGNORECASE
+)
+
+def query_terms(text):
+    """
+    Distinct content words of text, stopwords removed (chunking.tokenize).
+    """
+    return list(dict.fromkeys(term for term in tokenize(text) if len(term) > 1))
+
+def match_expression(terms, operator):
+    """
+    FTS5 MATCH expression joining the quoted terms with AND or OR.
+    """
+    return f" {operator} ".join(f'"{term}"' for term in terms)
+
+class KnowledgeBase:
+    """
+    SQLite FTS5 index of extracted contexts with their source URL, search query, research topic and timestamp.
+    One entry per URL; storing a URL again replaces its older context.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.stored = 0
+        self.retrieved = 0
+        self.searches_skipped = 0
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS contexts ("
+            "id INTEGER PRIMARY KEY, url TEXT NOT NULL UNIQUE, text TEXT NOT NULL, "
+            "query TEXT, topic TEXT, created REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS contexts_fts USING fts5("
+            "text, query, topic, content='contexts', content_rowid='id')"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS contexts_insert AFTER INSERT ON contexts BEGIN "
+            "INSERT INTO contexts_fts (rowid, text, query, topic) VALUES (new.id, new.text, new.query, new.topic); END"
+        )
+        self._conn.execute(
+            "CREATE TRIGGER IF NOT EXISTS contexts_delete AFTER DELETE ON contexts BEGIN "
+            "INSERT INTO contexts_fts (contexts_fts, rowid, text, query, topic) "
+            "VALUES ('delete', old.id, old.text, old.query, old.topic); END"
+        )
+
+    def add(self, text, url, query=None, topic=None):
+        with self._lock:
+            self._conn.execute("BEGIN")
+            self._conn.execute("DELETE FROM contexts WHERE url = ?", (url,))
+            self._conn.execute(
+                "INSERT INTO contexts (url, text, query, topic, created) VALUES (?, ?, ?, ?, ?)",
+                (url, text, query, topic, time.time())
+            )
+            self._conn.execute("COMMIT")
+            self.stored += 1
+
+    def retrieve(self, queries, limit=None, exclude_urls=()):
+        """
+        Best-matching fresh stored contexts (BM25 over text, search query and topic) for any of the given queries,
+        newest first among equals. A context is only returned when it contains at least KNOWLEDGE_MIN_COVERAGE
+        of one query's terms, so a shared common word alone never pulls in an unrelated source.
+        Returns (text, url) pairs.
+        """
+        limit = limit or KNOWLEDGE_TOP_K
+        terms_per_query = [terms for terms in map(query_terms, queries) if terms]
+        term_sets = [set(terms) for terms in terms_per_query]
+        terms = list(dict.fromkeys(term for terms in terms_per_query for term in terms))
+        if not terms:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT contexts.text, contexts.url, contexts.query, contexts.topic "
+                "FROM contexts_fts JOIN contexts ON contexts.id = contexts_fts.rowid "
+                "WHERE contexts_fts MATCH ? AND contexts.created >= ? "
+                "ORDER BY bm25(contexts_fts), contexts.created DESC LIMIT ?",
+                (match_expression(terms, "OR"), time.time() - KNOWLEDGE_FRESH_SECONDS,
+                 KNOWLEDGE_CANDIDATES + len(exclude_urls))
+            ).fetchall()
+        results = []
+        for text, url, query, topic in rows:
+            if url in exclude_urls:
+                continue
+            words = set(tokenize(f"{text} {query or ''} {topic or ''}"))
+            if any(len(term_set & words) >= KNOWLEDGE_MIN_COVERAGE * len(term_set) for term_set in term_sets):
+                results.append((text, url))
+                if len(results) == limit:
+                    break
+        self.retrieved += len(results)
+        return results
+
+    def covering_contexts(self, query, before=None):
+        """
+        Freshness policy: the KNOWLEDGE_MIN_MATCHES best recent stored contexts containing every term of the query,
+        as (text, url) pairs, when there are that many; otherwise (or for time-sensitive queries) [], meaning
+        the query needs a live search. Callers skipping the search should use these contexts in its place.
+        before: Only count contexts stored before this timestamp, e.g. the start of the current run
+        """
+        if TIME_SENSITIVE_PATTERN.search(query):
+            return []
+        terms = query_terms(query)
+        if not terms:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT contexts.text, contexts.url FROM contexts_fts JOIN contexts ON contexts.id = contexts_fts.rowid "
+                "WHERE contexts_fts MATCH ? AND contexts.created >= ? AND contexts.created < ? "
+                "ORDER BY bm25(contexts_fts), contexts.created DESC LIMIT ?",
+                (match_expression(terms, "AND"), time.time() - KNOWLEDGE_FRESH_SECONDS, before or time.time(), KNOWLEDGE_MIN_MATCHES)
+            ).fetchall()
+        if len(rows) < KNOWLEDGE_MIN_MATCHES:
+            return []
+        self.searches_skipped += 1
+        self.retrieved += len(rows)
+        return [(text, url) for text, url in rows]
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM contexts")
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM contexts").fetchone()[0]
+        return {
+            "entries": entries,
+            "stored": self.stored,
+            "retrieved": self.retrieved,
+            "searches_skipped": self.searches_skipped,
+        }
+
+_knowledge_base = None
+_knowledge_base_lock = threading.Lock()
+
+def get_knowledge_base():
+    """
+    Return the process-wide knowledge base, creating it on first use. Returns None unless KNOWLEDGE_BASE_ENABLED is set.
+    """
+    global _knowledge_base
+    if not KNOWLEDGE_BASE_ENABLED:
+        return None
+    with _knowledge_base_lock:
+        if _knowledge_base is None:
+            _knowledge_base = KnowledgeBase(os.path.join(cache.CACHE_DIR, "knowledge.sqlite3"))
+    return _knowledge_base
@@ -0,0 +1,41 @@
+from research.dedup import shingles
+
+# Adaptive early stopping based on how much genuinely new material each iteration adds
+NOVELTY_STOPPING_ENABLED = True
+NOVELTY_THRESHOLD = 0.25     # marginal novelty below this counts as a low-yield iteration
+NOVELTY_PATIENCE = 2         # stop after this many consecutive low-yield iterations
+NOVELTY_MIN_ITERATIONS = 2   # never stop on novelty before this many iterations have run
+
+class NoveltyTracker:
+    """
+    Measures the marginal novelty of each batch of extracted contexts as the fraction of its word
+    shingles not already present in earlier contexts, and decides when the run has stopped learning.
+    """
+    def __init__(self, threshold=NOVELTY_THRESHOLD, patience=NOVELTY_PATIENCE, min_iterations=NOVELTY_MIN_ITERATIONS):
+        self.threshold = threshold
+        self.patience = patience
+        self.min_iterations = min_iterations
+        self.seen = set()
+        self.history = []
+        self.low_streak = 0
+
+    def measure(self, texts):
+        """
+        Record a new batch of context texts and return its novelty in [0, 1]. An empty batch scores 0.
+        """
+        batch = set()
+        for text in texts:
+            batch.update(shingles(text))
+        novelty = len(batch - self.seen) / len(batch) if batch else 0.0
+        self.seen.update(batch)
+        self.history.append(novelty)
+        if novelty < self.threshold:
+            self.low_streak += 1
+        else:
+            self.low_streak = 0
+        return novelty
+
+    def should_stop(self):
+        if not NOVELTY_STOPPING_ENABLED:
+            return False
+        return len(self.history) >= self.min_iterations and self.low_streak >= self.patience
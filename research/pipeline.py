@@ -0,0 +1,83 @@
+import asyncio
+
+class Pipeline:
+    """
+    Chain of asynchronous stages connected by bounded queues.
+    Each stage is (name, coroutine_function, worker_count); the function receives a job and returns it
+    to hand it to the next stage, or None to drop it. Every submitted job is reported exactly once to
+    on_done(job, completed) when it either leaves the last stage (completed=True) or is dropped.
+    Bounded queues give backpressure: submit() waits while the first stage is saturated.
+    """
+    def __init__(self, stages, queue_size, on_done=None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.on_done = on_done
+        self.pending = 0
+        self.stage_counts = {name: 0 for name, _, _ in stages}
+        self._queues = []
+        self._workers = []
+        self._condition = None
+        self._closed = False
+
+    def start(self):
+        self._queues = [asyncio.Queue(self.queue_size) for _ in self.stages]
+        self._condition = asyncio.Condition()
+        for index, (name, _, workers) in enumerate(self.stages):
+            for _ in range(workers):
+                self._workers.append(asyncio.create_task(self._worker(index)))
+
+    async def submit(self, job):
+        self.pending += 1
+        await self._queues[0].put(job)
+
+    async def _worker(self, index):
+        name, func, _ = self.stages[index]
+        queue = self._queues[index]
+        last_stage = index == len(self.stages) - 1
+        while not self._closed:
+            job = await queue.get()
+            try:
+                try:
+                    result = await func(job)
+                except Exception as e:
+                    print(f"Pipeline stage '{name}' failed:", e)
+                    result = None
+                self.stage_counts[name] += 1
+                if result is not None and not last_stage:
+                    await self._queues[index + 1].put(result)
+                else:
+                    await self._finish(job, result is not None)
+            finally:
+                queue.task_done()
+
+    async def _finish(self, job, completed):
+        self.pending -= 1
+        if self.on_done is not None:
+            self.on_done(job, completed)
+        async with self._condition:
+            self._condition.notify_all()
+
+    async def wait_for(self, predicate):
+        """
+        Block until predicate() is true; it is re-evaluated each time a job leaves the pipeline.
+        """
+        async with self._condition:
+            await self._condition.wait_for(predicate)
+
+    async def join(self):
+        """
+        Wait until every submitted job has been reported.
+        """
+        await self.wait_for(lambda: self.pending == 0)
+
+    async def close(self):
+        self._closed = True
+        workers = [task for task in self._workers if not task.done()]
+        # A cancellation can be swallowed when a stage's own wait_for finishes at the same moment,
+        # so keep cancelling until every worker has actually stopped
+        while workers:
+            for task in workers:
+                task.cancel()
+            await asyncio.wait(workers, timeout=0.1)
+            workers = [task for task in workers if not task.done()]
+        self._workers = []
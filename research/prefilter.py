@@ -0,0 +1,128 @@
+import random
+import re
+import threading
+
+from research.chunking import tokenize
+
+# Local prefilter that runs between fetching a page and asking the LLM whether it is relevant
+PREFILTER_ENABLED = True
+MIN_WORDS = 60                  # pages shorter than this are rejected outright
+REJECT_COVERAGE = 0.15          # reject when fewer than this fraction of query terms appear
+MAX_BOILERPLATE_RATIO = 0.7     # reject when most lines look like navigation, cookie walls or errors ...
+BOILERPLATE_MAX_COVERAGE = 0.5  # ... unless the page covers this much of the query; then the LLM decides
+ACCEPT_COVERAGE = 0.9           # auto-accept when nearly every query term appears ...
+ACCEPT_MIN_WORDS = 400          # ... in a substantial page ...
+ACCEPT_MAX_BOILERPLATE = 0.3    # ... that is mostly real content
+ACCEPT_MIN_QUERY_TERMS = 3      # short queries are too easy to cover to auto-accept on
+AUDIT_RATE = 0.05               # fraction of local decisions double-checked with the LLM
+
+# Whole banner phrases rather than single words, so pages about cookies or consent are not boilerplate
+BOILERPLATE_PATTERNS = re.compile(
+    r"\b(we use cookies|(this|our) (site|website) uses cookies|cookie (policy|settings|preferences|notice)|"
+    r"accept (all )?cookies|manage (your )?(consent|cookies)|consent preferences|privacy policy|"
+    r"terms of (use|service)|sign (in|up|out)|log (in|out)|subscribe (to|for) (our|the) newsletter|"
+    r"sign up for (our|the) newsletter|all rights reserved|enable javascript|access denied|captcha|"
+    r"page not found|403 forbidden)\b|"
+    r"\b(error|http)\W{0,3}404\b|\b404\W{0,3}(error|not found)\b|"
+    r"^\s*[\*\-]?\s*\[[^\]]*\]\([^)]*\)\s*$",
+    re.IGNORECASE
+)
+
+REJECT = "reject"
+ACCEPT = "accept"
+ASK_LLM = "llm"
+
+class PageScore:
+    def __init__(self, words, coverage, boilerplate_ratio, query_terms):
+        self.words = words
+        self.coverage = coverage
+        self.boilerplate_ratio = boilerplate_ratio
+        self.query_terms = query_terms
+
+def is_boilerplate_line(line, query_terms):
+    """
+    True for a short line with a boilerplate pattern hit that does not involve a query term
+    (a "privacy policy" line is not boilerplate on a page researched for privacy policies).
+    """
+    if len(line) >= 200:
+        return False
+    return any(query_terms.isdisjoint(tokenize(match.group())) for match in BOILERPLATE_PATTERNS.finditer(line))
+
+def score_page(page_text, user_query):
+    """
+    Compute cheap lexical signals for a page: word count, fraction of query terms present,
+    and the fraction of non-empty lines that look like boilerplate.
+    """
+    words = tokenize(page_text)
+    query_terms = set(tokenize(user_query))
+    coverage = len(query_terms.intersection(words)) / len(query_terms) if query_terms else 1.0
+    lines = [line for line in page_text.splitlines() if line.strip()]
+    boilerplate = sum(1 for line in lines if is_boilerplate_line(line, query_terms))
+    boilerplate_ratio = boilerplate / len(lines) if lines else 1.0
+    return PageScore(len(words), coverage, boilerplate_ratio, len(query_terms))
+
+def classify_page(page_text, user_query):
+    """
+    Return REJECT, ACCEPT or ASK_LLM for a fetched page according to the configured thresholds.
+    """
+    if not PREFILTER_ENABLED:
+        return ASK_LLM
+    score = score_page(page_text, user_query)
+    if score.words < MIN_WORDS:
+        return REJECT
+    if score.boilerplate_ratio > MAX_BOILERPLATE_RATIO and score.coverage < BOILERPLATE_MAX_COVERAGE:
+        return REJECT
+    if score.coverage < REJECT_COVERAGE:
+        return REJECT
+    if (score.coverage >= ACCEPT_COVERAGE
+            and score.query_terms >= ACCEPT_MIN_QUERY_TERMS
+            and score.words >= ACCEPT_MIN_WORDS
+            and score.boilerplate_ratio <= ACCEPT_MAX_BOILERPLATE):
+        return ACCEPT
+    return ASK_LLM
+
+class PrefilterStats:
+    """
+    Counters for prefilter decisions, LLM calls saved, and agreement with the LLM on audited samples.
+    seed: Optional seed for the audit sampling, for reproducible runs (e.g. benchmarks)
+    """
+    def __init__(self, seed=None):
+        self._lock = threading.Lock()
+        self._random = random.Random(seed)
+        self.rejected = 0
+        self.accepted = 0
+        self.sent_to_llm = 0
+        self.audited = 0
+        self.agreed = 0
+
+    def record(self, decision):
+        with self._lock:
+            if decision == REJECT:
+                self.rejected += 1
+            elif decision == ACCEPT:
+                self.accepted += 1
+            else:
+                self.sent_to_llm += 1
+
+    def should_audit(self):
+        return self._random.random() < AUDIT_RATE
+
+    def record_audit(self, decision, llm_verdict):
+        with self._lock:
+            self.audited += 1
+            if (decision == ACCEPT) == (llm_verdict == "Yes"):
+                self.agreed += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "rejected": self.rejected,
+                "accepted": self.accepted,
+                "sent_to_llm": self.sent_to_llm,
+                # Audited pages still cost an LLM call
+                "llm_calls_saved": self.rejected + self.accepted - self.audited,
+                "audited": self.audited,
+                "audit_accuracy": self.agreed / self.audited if self.audited else None,
+            }
+
+STATS = PrefilterStats()
@@ -0,0 +1,76 @@
+import threading
+
+# Model used for any stage without an explicit entry in STAGE_MODELS
+DEFAULT_MODEL = "google/gemini-2.0-flash-lite-preview-02-05:free"  # Gemini Flash 2.0 model identifier
+
+# Per-stage model selection, keyed by the `purpose` passed to call_openrouter_async
+STAGE_MODELS = {
+    "queries": DEFAULT_MODEL,
+    "relevance": DEFAULT_MODEL,
+    "relevance_batch": DEFAULT_MODEL,
+    "extraction": DEFAULT_MODEL,
+    "summary": DEFAULT_MODEL,
+    "planning": DEFAULT_MODEL,
+    "synthesis": DEFAULT_MODEL,
+    "report": DEFAULT_MODEL,
+}
+
+# Cascade mode: try a small, fast model first for these stages and escalate to the stage model
+# when its answer cannot be parsed or looks unsure
+CASCADE_ENABLED = False
+CASCADE_SMALL_MODEL = "meta-llama/llama-3.2-3b-instruct:free"
+CASCADE_STAGES = {"queries", "relevance", "relevance_batch"}
+
+def model_for(purpose):
+    return STAGE_MODELS.get(purpose, DEFAULT_MODEL)
+
+def models_for(purpose):
+    """
+    Ordered list of models to try for a stage: [small, stage model] in cascade mode, else [stage model].
+    """
+    model = model_for(purpose)
+    if CASCADE_ENABLED and purpose in CASCADE_STAGES and CASCADE_SMALL_MODEL != model:
+        return [CASCADE_SMALL_MODEL, model]
+    return [model]
+
+class ModelStats:
+    """
+    Per-model call counts, latency and token usage (from OpenRouter's `usage` field), plus cascade escalations.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models = {}
+
+    def _entry(self, model):
+        entry = self._models.get(model)
+        if entry is None:
+            entry = {
+                "calls": 0, "failures": 0, "escalations": 0, "latency": 0.0,
+                "prompt_tokens": 0, "completion_tokens": 0,
+            }
+            self._models[model] = entry
+        return entry
+
+    def record_call(self, model, latency, usage=None, ok=True):
+        with self._lock:
+            entry = self._entry(model)
+            entry["calls"] += 1
+            entry["latency"] += latency
+            if not ok:
+                entry["failures"] += 1
+            if usage:
+                entry["prompt_tokens"] += usage.get("prompt_tokens") or 0
+                entry["completion_tokens"] += usage.get("completion_tokens") or 0
+
+    def record_escalation(self, model):
+        with self._lock:
+            self._entry(model)["escalations"] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                model: dict(entry, avg_latency=entry["latency"] / entry["calls"] if entry["calls"] else 0.0)
+                for model, entry in self._models.items()
+            }
+
+STATS = ModelStats()
@@ -0,0 +1,277 @@
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from research import tracing
+
+# Per-provider limits shared by every request in the process.
+# concurrency: maximum in-flight requests; requests_per_second / tokens_per_minute: None disables the bucket
+PROVIDER_LIMITS = {
+    "openrouter": {"concurrency": 8, "requests_per_second": 4, "tokens_per_minute": 400000},
+    "serpapi": {"concurrency": 4, "requests_per_second": 2, "tokens_per_minute": None},
+    "jina": {"concurrency": 10, "requests_per_second": 8, "tokens_per_minute": None},
+    "web": {"concurrency": 16, "requests_per_second": None, "tokens_per_minute": None},   # direct page downloads
+}
+
+# Retry policy
+MAX_RETRIES = 4
+BACKOFF_BASE = 1.0      # seconds before the first retry
+BACKOFF_MAX = 60.0      # upper bound for a single backoff delay
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+def parse_retry_after(value):
+    """
+    Convert a Retry-After header (delta-seconds or HTTP date) to a delay in seconds, or None if absent/invalid.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def backoff_delay(attempt, retry_after=None):
+    """
+    Exponential backoff with full jitter; a server-provided Retry-After always takes precedence.
+    """
+    delay = parse_retry_after(retry_after)
+    if delay is not None:
+        return min(delay, BACKOFF_MAX)
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+class TokenBucket:
+    """
+    Classic token bucket: refills continuously at `rate` units per second up to `capacity`.
+    """
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, amount=1):
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+class FairSemaphore:
+    """
+    Semaphore that hands each free slot to the waiting run holding the fewest slots, so a run with many
+    queued requests cannot starve the others. Requests of the same run are served in FIFO order;
+    run=None is treated as one more run.
+    """
+    def __init__(self, value):
+        self._free = value
+        self._held = {}
+        self._waiters = {}
+
+    async def acquire(self, run=None):
+        if self._free > 0 and not self._waiters:
+            self._grant(run)
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault(run, deque()).append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted just as we were cancelled; pass it on
+                self.release(run)
+            else:
+                queue = self._waiters.get(run)
+                if queue is not None and future in queue:
+                    queue.remove(future)
+                    if not queue:
+                        del self._waiters[run]
+            raise
+
+    def release(self, run=None):
+        self._held[run] -= 1
+        if not self._held[run]:
+            del self._held[run]
+        self._free += 1
+        self._wake()
+
+    def _grant(self, run):
+        self._free -= 1
+        self._held[run] = self._held.get(run, 0) + 1
+
+    def _wake(self):
+        while self._free > 0 and self._waiters:
+            run = min(self._waiters, key=lambda key: self._held.get(key, 0))
+            queue = self._waiters[run]
+            future = queue.popleft()
+            if not queue:
+                del self._waiters[run]
+            if future.done():
+                continue
+            self._grant(run)
+            future.set_result(None)
+
+class ProviderLimiter:
+    """
+    Concurrency cap, request-rate and token-rate buckets for one upstream provider, plus queue-wait counters.
+    Concurrency slots are shared fairly between concurrent research runs (keyed on the active tracer).
+    asyncio primitives are recreated when the limiter is first used from a different event loop,
+    so one limiter can serve successive asyncio.run() calls (e.g. Streamlit reruns).
+    """
+    def __init__(self, name, concurrency, requests_per_second=None, tokens_per_minute=None):
+        self.name = name
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
+        self.tokens_per_minute = tokens_per_minute
+        self._loop = None
+        self._paused_until = 0.0
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _bind(self):
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._semaphore = FairSemaphore(self.concurrency)
+            self._request_bucket = (
+                TokenBucket(self.requests_per_second, max(1, self.requests_per_second))
+                if self.requests_per_second else None
+            )
+            self._token_bucket = (
+                TokenBucket(self.tokens_per_minute / 60.0, self.tokens_per_minute)
+                if self.tokens_per_minute else None
+            )
+
+    def pause(self, seconds):
+        """
+        Hold back every new request to this provider for the given number of seconds (used on 429).
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    @asynccontextmanager
+    async def slot(self, tokens=0):
+        """
+        Wait for a free concurrency slot and enough rate budget, then yield. tokens: estimated LLM tokens.
+        """
+        self._bind()
+        tracer = tracing.get_tracer()
+        run = tracer.trace_id if tracer is not None else None
+        queued_at = time.monotonic()
+        await self._semaphore.acquire(run)
+        try:
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            if self._request_bucket is not None:
+                await self._request_bucket.acquire(1)
+            if self._token_bucket is not None and tokens:
+                await self._token_bucket.acquire(tokens)
+            waited = time.monotonic() - queued_at
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+        finally:
+            self._semaphore.release(run)
+
+    def stats(self):
+        return {
+            "requests": self.requests,
+            "retries": self.retries,
+            "throttled": self.throttled,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "avg_queue_wait": self.total_wait / self.requests if self.requests else 0.0,
+            "max_queue_wait": self.max_wait,
+        }
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+def get_limiter(provider):
+    """
+    Return the process-wide limiter for a provider, configured from PROVIDER_LIMITS.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limits = PROVIDER_LIMITS.get(provider, {"concurrency": 4})
+            limiter = ProviderLimiter(provider, **limits)
+            _limiters[provider] = limiter
+        return limiter
+
+def limiter_stats():
+    with _limiters_lock:
+        return {name: limiter.stats() for name, limiter in _limiters.items()}
+
+async def request_with_retries(provider, make_request, tokens=0, read_body=None):
+    """
+    Send a request through the provider's limiter, retrying 429/5xx responses and connection errors
+    with exponential backoff (honoring Retry-After).
+    make_request: zero-argument callable returning an aiohttp request context manager
+    read_body: Optional coroutine function reading a 200 response's body (e.g. with a size cap); defaults to resp.text()
+    Returns (status, body_text). Raises the last connection error if every attempt failed to connect.
+    """
+    limiter = get_limiter(provider)
+    for attempt in range(MAX_RETRIES + 1):
+        retry_after = None
+        try:
+            async with limiter.slot(tokens):
+                async with make_request() as resp:
+                    status = resp.status
+                    if read_body is not None and status == 200:
+                        body = await read_body(resp)
+                    else:
+                        body = await resp.text()
+                    retry_after = resp.headers.get("Retry-After")
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+            if attempt == MAX_RETRIES:
+                raise
+            status, body = None, ""
+
+        if status is not None and (status not in RETRY_STATUSES or attempt == MAX_RETRIES):
+            return status, body
+
+        delay = backoff_delay(attempt, retry_after)
+        limiter.retries += 1
+        tracing.add(retries=1)
+        if status == 429:
+            limiter.throttled += 1
+            limiter.pause(delay)
+        print(f"{provider} request failed with status {status}; retrying in {delay:.1f}s "
+              f"(attempt {attempt + 1}/{MAX_RETRIES})")
+        await asyncio.sleep(delay)
+
+def reset_limiters():
+    """
+    Drop every limiter so the next request rebuilds them from PROVIDER_LIMITS (e.g. between benchmark scenarios).
+    """
+    with _limiters_lock:
+        _limiters.clear()
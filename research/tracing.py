@@ -0,0 +1,211 @@
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# When set, every finished run appends its spans to this JSONL file
+TRACE_EXPORT_PATH = os.environ.get("DEEP_RESEARCH_TRACE_FILE")
+
+# Numeric span attributes that are summed per stage in Tracer.summary()
+SUMMED_ATTRIBUTES = ("bytes", "prompt_tokens", "completion_tokens", "llm_calls", "cache_hits", "retries")
+
+_current_tracer = contextvars.ContextVar("deep_research_tracer", default=None)
+_current_span = contextvars.ContextVar("deep_research_span", default=None)
+
+class Span:
+    def __init__(self, trace_id, name, parent_id=None, attributes=None):
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self.end = None
+        self.error = None
+
+    @property
+    def duration(self):
+        return (self.end or time.time()) - self.start
+
+    def add(self, **values):
+        """
+        Accumulate numeric values (e.g. tokens, retries) into the span's attributes.
+        """
+        for key, value in values.items():
+            self.attributes[key] = self.attributes.get(key, 0) + value
+
+    def to_record(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start": self.start,
+            "end": self.end,
+            "duration": self.duration,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+    def to_otel(self):
+        """
+        Render the span in the OTLP/JSON span shape used by OpenTelemetry collectors.
+        """
+        attributes = []
+        for key, value in self.attributes.items():
+            if isinstance(value, bool):
+                attributes.append({"key": key, "value": {"boolValue": value}})
+            elif isinstance(value, int):
+                attributes.append({"key": key, "value": {"intValue": str(value)}})
+            elif isinstance(value, float):
+                attributes.append({"key": key, "value": {"doubleValue": value}})
+            else:
+                attributes.append({"key": key, "value": {"stringValue": str(value)}})
+        record = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": 1,
+            "startTimeUnixNano": str(int(self.start * 1e9)),
+            "endTimeUnixNano": str(int((self.end or time.time()) * 1e9)),
+            "attributes": attributes,
+            "status": {"code": 2, "message": self.error} if self.error else {"code": 1},
+        }
+        if self.parent_id:
+            record["parentSpanId"] = self.parent_id
+        return record
+
+class Tracer:
+    """
+    Collects the spans of one research run (search, fetch, relevance, extract, plan, report, ...).
+    """
+    def __init__(self, run_name="research"):
+        self.trace_id = uuid.uuid4().hex
+        self.run_name = run_name
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def start_span(self, name, **attributes):
+        """
+        Open a span without making it current; for code such as async generators that cannot hold
+        a context variable across yields. Close it with end_span().
+        """
+        parent = _current_span.get()
+        return Span(self.trace_id, name, parent.span_id if parent else None, attributes)
+
+    def end_span(self, span, error=None):
+        span.end = time.time()
+        if error is not None:
+            span.error = error
+        with self._lock:
+            self.spans.append(span)
+
+    @contextmanager
+    def span(self, name, **attributes):
+        span = self.start_span(name, **attributes)
+        token = _current_span.set(span)
+        error = None
+        try:
+            yield span
+        except BaseException as e:
+            error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span, error)
+
+    def summary(self):
+        """
+        Per-stage totals: span count, wall time, bytes, tokens, LLM calls, cache hits, retries and errors.
+        """
+        stages = {}
+        with self._lock:
+            spans = list(self.spans)
+        for span in spans:
+            stage = stages.setdefault(span.name, dict(
+                {"count": 0, "seconds": 0.0, "errors": 0}, **{key: 0 for key in SUMMED_ATTRIBUTES}
+            ))
+            stage["count"] += 1
+            stage["seconds"] += span.duration
+            if span.error:
+                stage["errors"] += 1
+            for key in SUMMED_ATTRIBUTES:
+                stage[key] += span.attributes.get(key, 0)
+        return stages
+
+    def to_jsonl(self, path):
+        with self._lock:
+            records = [span.to_record() for span in self.spans]
+        with open(path, "a", encoding="utf-8") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+    def to_otel(self):
+        """
+        Spans as an OTLP/JSON ExportTraceServiceRequest body.
+        """
+        with self._lock:
+            spans = [span.to_otel() for span in self.spans]
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": "open-deep-research"}}]},
+                "scopeSpans": [{"scope": {"name": "research." + self.run_name}, "spans": spans}],
+            }]
+        }
+
+@contextmanager
+def use_tracer(tracer):
+    """
+    Make tracer the current tracer for code (and tasks created) inside the block.
+    """
+    token = _current_tracer.set(tracer)
+    try:
+        yield tracer
+    finally:
+        _current_tracer.reset(token)
+
+async def run_traced(tracer, awaitable):
+    """
+    Await `awaitable` with tracer as the current tracer. Keeps the context variable inside a single task,
+    which makes it safe to use from async generators.
+    """
+    with use_tracer(tracer):
+        return await awaitable
+
+def export(tracer):
+    """
+    Append the run's spans to TRACE_EXPORT_PATH, if configured.
+    """
+    if TRACE_EXPORT_PATH:
+        tracer.to_jsonl(TRACE_EXPORT_PATH)
+
+def get_tracer():
+    return _current_tracer.get()
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Open a span on the current tracer, or do nothing when no tracer is active.
+    """
+    tracer = _current_tracer.get()
+    if tracer is None:
+        yield None
+        return
+    with tracer.span(name, **attributes) as current:
+        yield current
+
+def add(**values):
+    """
+    Accumulate numeric values into the innermost open span, if any.
+    """
+    current = _current_span.get()
+    if current is not None:
+        current.add(**values)
+
+def set_attributes(**attributes):
+    current = _current_span.get()
+    if current is not None:
+        current.attributes.update(attributes)